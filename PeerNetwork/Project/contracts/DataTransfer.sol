@@ -10,9 +10,36 @@ contract DataTransfer {
         string response;
     }
 
+    struct Subscription {
+        address requester;
+        address target;
+        string dbQuery;
+        uint interval; // Seconds between deliveries
+        bool active;
+    }
+
     mapping(uint => Request) public requests;
     uint public nextRequestId = 1;
 
+    mapping(uint => Subscription) public subscriptions;
+    uint public nextSubscriptionId = 1;
+
+    // Hot wallet => peer account it answers on behalf of
+    mapping(address => address) public responderOwner;
+
+    // Requests fulfilled through a Merkle-committed batch, one bit each, 256 per storage word
+    mapping(uint => uint) private batchFulfilledWords;
+
+    // Merkle root of (requestId, responseHash) leaves => responder that committed it
+    mapping(bytes32 => address) public batchResponder;
+
+    // "host:port" where a peer accepts direct (off-chain) queries
+    mapping(address => string) public endpoints;
+
+    // Responder-signed commitments already recorded, so none is counted twice
+    mapping(bytes32 => bool) public committedTransfers;
+    uint public nextTransferId = 1;
+
 
     event RequestCreated(
         uint indexed requestId,
@@ -27,6 +54,40 @@ contract DataTransfer {
         string response
     );
 
+    event ResponsesCommitted(bytes32 indexed root, address indexed responder, uint[] requestIds);
+
+    event ResponderAuthorized(address indexed owner, address indexed responder);
+
+    event ResponderRevoked(address indexed owner, address indexed responder);
+
+    event EndpointSet(address indexed peer, string endpoint);
+
+    event TransferCommitted(
+        uint indexed transferId,
+        address indexed requester,
+        address indexed responder,
+        bytes32 queryHash,
+        bytes32 resultHash,
+        uint size,
+        bytes32 nonce
+    );
+
+    event SubscriptionCreated(
+        uint indexed subscriptionId,
+        address indexed requester,
+        address indexed target,
+        string dbQuery,
+        uint interval
+    );
+
+    event SubscriptionCancelled(uint indexed subscriptionId);
+
+    event SubscriptionDelivered(
+        uint indexed subscriptionId,
+        address indexed responder,
+        string response
+    );
+
     function createRequest(address _target, string calldata _dbQuery) external returns (uint) {
         uint requestId = nextRequestId++;
         requests[requestId] = Request({
@@ -40,12 +101,176 @@ contract DataTransfer {
         return requestId;
     }
 
+    // Fan one query out to several peers; request IDs are consecutive from the returned one
+    function createRequests(address[] calldata _targets, string calldata _dbQuery) external returns (uint) {
+        require(_targets.length > 0, "No targets");
+        uint firstId = nextRequestId;
+        for (uint i = 0; i < _targets.length; i++) {
+            uint requestId = nextRequestId++;
+            requests[requestId] = Request({
+                requester: msg.sender,
+                target: _targets[i],
+                dbQuery: _dbQuery,
+                fulfilled: false,
+                response: ""
+            });
+            emit RequestCreated(requestId, msg.sender, _targets[i], _dbQuery);
+        }
+        return firstId;
+    }
+
     function submitResponse(uint _requestId, string calldata _response) external {
         Request storage req = requests[_requestId];
-        require(!req.fulfilled, "Request already fulfilled");
+        require(!req.fulfilled && !_batchFulfilled(_requestId), "Request already fulfilled");
         req.fulfilled = true;
         req.response = _response;
-        emit ResponseSent(_requestId, msg.sender, _response);
+        emit ResponseSent(_requestId, _responder(), _response);
+    }
+
+    // Fulfil many requests with one Merkle root; responses travel off chain with
+    // their inclusion proofs. The root is built here from the (requestId,
+    // responseHash) leaves, so it can only prove responses to the IDs it marked
+    // fulfilled. Sorted IDs share storage words and cost the least.
+    function commitResponseBatch(
+        uint[] calldata _requestIds,
+        bytes32[] calldata _responseHashes
+    ) external returns (bytes32) {
+        require(_requestIds.length > 0, "Empty batch");
+        require(_requestIds.length == _responseHashes.length, "Length mismatch");
+        address responder = _responder();
+        bytes32[] memory nodes = new bytes32[](_requestIds.length);
+
+        uint wordIndex = _requestIds[0] >> 8;
+        uint word = batchFulfilledWords[wordIndex];
+        for (uint i = 0; i < _requestIds.length; i++) {
+            uint requestId = _requestIds[i];
+            Request storage req = requests[requestId];
+            require(req.target == responder, "Not the request target");
+            require(!req.fulfilled, "Request already fulfilled");
+            if (requestId >> 8 != wordIndex) {
+                batchFulfilledWords[wordIndex] = word;
+                wordIndex = requestId >> 8;
+                word = batchFulfilledWords[wordIndex];
+            }
+            uint bit = uint(1) << (requestId & 255);
+            require(word & bit == 0, "Request already fulfilled");
+            word |= bit;
+            nodes[i] = keccak256(bytes.concat(keccak256(abi.encodePacked(requestId, _responseHashes[i]))));
+        }
+        batchFulfilledWords[wordIndex] = word;
+
+        bytes32 root = _merkleRoot(nodes);
+        require(batchResponder[root] == address(0), "Batch already committed");
+        batchResponder[root] = responder;
+        emit ResponsesCommitted(root, responder, _requestIds);
+        return root;
+    }
+
+    // Same tree as signed_responses.merkle_levels: sorted pairs, an odd node carried up.
+    // Each level overwrites the front of _nodes.
+    function _merkleRoot(bytes32[] memory _nodes) internal pure returns (bytes32) {
+        uint count = _nodes.length;
+        while (count > 1) {
+            for (uint i = 0; i < count / 2; i++) {
+                _nodes[i] = _hashPair(_nodes[2 * i], _nodes[2 * i + 1]);
+            }
+            if (count % 2 == 1) {
+                _nodes[count / 2] = _nodes[count - 1];
+            }
+            count = (count + 1) / 2;
+        }
+        return _nodes[0];
+    }
+
+    function _hashPair(bytes32 a, bytes32 b) internal pure returns (bytes32) {
+        return a <= b ? keccak256(abi.encodePacked(a, b)) : keccak256(abi.encodePacked(b, a));
+    }
+
+    // On-chain check of an inclusion proof. Roots are only ever built from the
+    // committed IDs, so a valid proof means the request was in that batch.
+    function verifyBatchedResponse(
+        bytes32 _root,
+        uint _requestId,
+        bytes32 _responseHash,
+        bytes32[] calldata _proof
+    ) external view returns (bool) {
+        address responder = batchResponder[_root];
+        if (responder == address(0) || requests[_requestId].target != responder || !_batchFulfilled(_requestId)) {
+            return false;
+        }
+        bytes32 node = keccak256(bytes.concat(keccak256(abi.encodePacked(_requestId, _responseHash))));
+        for (uint i = 0; i < _proof.length; i++) {
+            node = _hashPair(node, _proof[i]);
+        }
+        return node == _root;
+    }
+
+    function _batchFulfilled(uint _requestId) internal view returns (bool) {
+        return batchFulfilledWords[_requestId >> 8] & (uint(1) << (_requestId & 255)) != 0;
+    }
+
+    // The hot wallet consents by signing (contract, owner), so no account can
+    // claim another's wallet and have that wallet's answers credited to it
+    function authorizeResponder(address _responder, bytes calldata _signature) external {
+        require(responderOwner[_responder] == address(0), "Responder already assigned");
+        bytes32 digest = keccak256(abi.encodePacked(address(this), msg.sender));
+        require(_recover(digest, _signature) == _responder, "Responder did not consent");
+        responderOwner[_responder] = msg.sender;
+        emit ResponderAuthorized(msg.sender, _responder);
+    }
+
+    function revokeResponder(address _responder) external {
+        require(responderOwner[_responder] == msg.sender, "Not responder owner");
+        delete responderOwner[_responder];
+        emit ResponderRevoked(msg.sender, _responder);
+    }
+
+    // Responses from an authorized hot wallet are attributed to the peer that owns it
+    function _responder() internal view returns (address) {
+        address owner = responderOwner[msg.sender];
+        return owner == address(0) ? msg.sender : owner;
+    }
+
+    function setEndpoint(string calldata _endpoint) external {
+        endpoints[msg.sender] = _endpoint;
+        emit EndpointSet(msg.sender, _endpoint);
+    }
+
+    // Record a query answered over the direct transport. The responder signed
+    // (contract, requester, queryHash, resultHash, size, nonce) when it served the
+    // result; the requester's per-query nonce lets identical queries with
+    // unchanged data each be recorded.
+    function commitTransfer(
+        address _responder,
+        bytes32 _queryHash,
+        bytes32 _resultHash,
+        uint _size,
+        bytes32 _nonce,
+        bytes calldata _signature
+    ) external returns (uint) {
+        bytes32 digest = keccak256(abi.encodePacked(address(this), msg.sender, _queryHash, _resultHash, _size, _nonce));
+        require(!committedTransfers[digest], "Transfer already committed");
+        address signer = _recover(digest, _signature);
+        require(signer != address(0), "Bad signature");
+        require(signer == _responder || responderOwner[signer] == _responder, "Not signed by responder");
+        committedTransfers[digest] = true;
+        uint transferId = nextTransferId++;
+        emit TransferCommitted(transferId, msg.sender, _responder, _queryHash, _resultHash, _size, _nonce);
+        return transferId;
+    }
+
+    // Signer of an eth_sign style signature over _digest
+    function _recover(bytes32 _digest, bytes calldata _signature) internal pure returns (address) {
+        require(_signature.length == 65, "Bad signature length");
+        bytes32 r;
+        bytes32 s;
+        uint8 v;
+        assembly {
+            r := calldataload(_signature.offset)
+            s := calldataload(add(_signature.offset, 32))
+            v := byte(0, calldataload(add(_signature.offset, 64)))
+        }
+        return ecrecover(keccak256(abi.encodePacked("\x19Ethereum Signed Message:\n32", _digest)), v, r, s);
     }
 
     function getRequest(uint _requestId) external view returns (
@@ -56,6 +281,77 @@ contract DataTransfer {
         string memory response
     ) {
         Request storage req = requests[_requestId];
-        return (req.requester, req.target, req.dbQuery, req.fulfilled, req.response);
+        return (req.requester, req.target, req.dbQuery, req.fulfilled || _batchFulfilled(_requestId), req.response);
+    }
+
+    // Routing and status for many requests in one eth_call, for clients tracking lots of outstanding IDs
+    function getRequestStatuses(uint[] calldata _requestIds) external view returns (
+        address[] memory requesters,
+        address[] memory targets,
+        bool[] memory fulfilled
+    ) {
+        requesters = new address[](_requestIds.length);
+        targets = new address[](_requestIds.length);
+        fulfilled = new bool[](_requestIds.length);
+        for (uint i = 0; i < _requestIds.length; i++) {
+            Request storage req = requests[_requestIds[i]];
+            requesters[i] = req.requester;
+            targets[i] = req.target;
+            fulfilled[i] = req.fulfilled || _batchFulfilled(_requestIds[i]);
+        }
+    }
+
+    // Same as getRequestStatuses for _count consecutive IDs from _fromId, clamped to existing requests
+    function getRequestStatusRange(uint _fromId, uint _count) external view returns (
+        address[] memory requesters,
+        address[] memory targets,
+        bool[] memory fulfilled
+    ) {
+        uint available = _fromId < nextRequestId ? nextRequestId - _fromId : 0;
+        uint length = _count < available ? _count : available;
+        requesters = new address[](length);
+        targets = new address[](length);
+        fulfilled = new bool[](length);
+        for (uint i = 0; i < length; i++) {
+            Request storage req = requests[_fromId + i];
+            requesters[i] = req.requester;
+            targets[i] = req.target;
+            fulfilled[i] = req.fulfilled || _batchFulfilled(_fromId + i);
+        }
+    }
+
+    function createSubscription(address _target, string calldata _dbQuery, uint _interval) external returns (uint) {
+        require(_interval > 0, "Interval must be positive");
+        uint subscriptionId = nextSubscriptionId++;
+        subscriptions[subscriptionId] = Subscription({
+            requester: msg.sender,
+            target: _target,
+            dbQuery: _dbQuery,
+            interval: _interval,
+            active: true
+        });
+        emit SubscriptionCreated(subscriptionId, msg.sender, _target, _dbQuery, _interval);
+        return subscriptionId;
+    }
+
+    function cancelSubscription(uint _subscriptionId) external {
+        Subscription storage sub = subscriptions[_subscriptionId];
+        require(sub.requester == msg.sender, "Not subscription owner");
+        require(sub.active, "Subscription not active");
+        sub.active = false;
+        emit SubscriptionCancelled(_subscriptionId);
+    }
+
+    // Deliveries live only in event logs; one transaction can serve many subscriptions
+    function deliverSubscriptions(uint[] calldata _subscriptionIds, string[] calldata _responses) external {
+        require(_subscriptionIds.length == _responses.length, "Length mismatch");
+        address responder = _responder();
+        for (uint i = 0; i < _subscriptionIds.length; i++) {
+            Subscription storage sub = subscriptions[_subscriptionIds[i]];
+            if (!sub.active || sub.target != responder) {
+                continue;
+            }
+            emit SubscriptionDelivered(_subscriptionIds[i], responder, _responses[i]);
+        }
     }
 }
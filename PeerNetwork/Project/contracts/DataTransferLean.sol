@@ -0,0 +1,102 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.0;
+
+// Gas-lean variant of DataTransfer: same events and entry points, but query
+// and response payloads live only in event logs. Storage keeps the routing
+// fields plus keccak256 commitments so payloads read from logs can be checked.
+//
+// The saving is in payload storage, so it comes mostly from responses. A
+// request still writes three fresh slots (requester, target, queryHash),
+// about what DataTransfer pays for a query under 32 bytes. Short structured
+// queries therefore cost about the same on either contract. Calldata and log
+// bytes are paid by both contracts.
+contract DataTransferLean {
+    struct Request {
+        address requester;     // slot 0, packed with fulfilled
+        bool fulfilled;
+        address target;        // slot 1
+        bytes32 queryHash;     // slot 2
+        bytes32 responseHash;  // slot 3
+    }
+
+    mapping(uint => Request) public requests;
+    uint public nextRequestId = 1;
+
+    event RequestCreated(
+        uint indexed requestId,
+        address indexed requester,
+        address indexed target,
+        string dbQuery
+    );
+
+    event ResponseSent(
+        uint indexed requestId,
+        address indexed responder,
+        string response
+    );
+
+    function createRequest(address _target, string calldata _dbQuery) external returns (uint) {
+        uint requestId = nextRequestId++;
+        Request storage req = requests[requestId];
+        req.requester = msg.sender;
+        req.target = _target;
+        req.queryHash = keccak256(bytes(_dbQuery));
+        emit RequestCreated(requestId, msg.sender, _target, _dbQuery);
+        return requestId;
+    }
+
+    function submitResponse(uint _requestId, string calldata _response) external {
+        Request storage req = requests[_requestId];
+        require(!req.fulfilled, "Request already fulfilled");
+        req.fulfilled = true;
+        req.responseHash = keccak256(bytes(_response));
+        emit ResponseSent(_requestId, msg.sender, _response);
+    }
+
+    function getRequest(uint _requestId) external view returns (
+        address requester,
+        address target,
+        bytes32 queryHash,
+        bool fulfilled,
+        bytes32 responseHash
+    ) {
+        Request storage req = requests[_requestId];
+        return (req.requester, req.target, req.queryHash, req.fulfilled, req.responseHash);
+    }
+
+    // Routing and status for many requests in one eth_call, for clients tracking lots of outstanding IDs
+    function getRequestStatuses(uint[] calldata _requestIds) external view returns (
+        address[] memory requesters,
+        address[] memory targets,
+        bool[] memory fulfilled
+    ) {
+        requesters = new address[](_requestIds.length);
+        targets = new address[](_requestIds.length);
+        fulfilled = new bool[](_requestIds.length);
+        for (uint i = 0; i < _requestIds.length; i++) {
+            Request storage req = requests[_requestIds[i]];
+            requesters[i] = req.requester;
+            targets[i] = req.target;
+            fulfilled[i] = req.fulfilled;
+        }
+    }
+
+    // Same as getRequestStatuses for _count consecutive IDs from _fromId, clamped to existing requests
+    function getRequestStatusRange(uint _fromId, uint _count) external view returns (
+        address[] memory requesters,
+        address[] memory targets,
+        bool[] memory fulfilled
+    ) {
+        uint available = _fromId < nextRequestId ? nextRequestId - _fromId : 0;
+        uint length = _count < available ? _count : available;
+        requesters = new address[](length);
+        targets = new address[](length);
+        fulfilled = new bool[](length);
+        for (uint i = 0; i < length; i++) {
+            Request storage req = requests[_fromId + i];
+            requesters[i] = req.requester;
+            targets[i] = req.target;
+            fulfilled[i] = req.fulfilled;
+        }
+    }
+}
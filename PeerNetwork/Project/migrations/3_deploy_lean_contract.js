@@ -0,0 +1,5 @@
+const DataTransferLean = artifacts.require("DataTransferLean");
+
+module.exports = function (deployer) {
+  deployer.deploy(DataTransferLean);
+};
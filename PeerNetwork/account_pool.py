@@ -0,0 +1,62 @@
+import os
+import json
+import itertools
+from web3 import Web3
+from eth_account import Account
+from tx_manager import TxManager
+from direct_transport import sign_digest
+
+class AccountPool:
+    """Hot wallets that answer on behalf of the peer, each with its own nonce sequence"""
+
+    def __init__(self, w3, contract, owner_manager, wallet_path, size):
+        self.w3 = w3
+        self.contract = contract
+        self.owner = owner_manager
+        self.keys = self._load_keys(wallet_path, size)
+        self.managers = [
+            TxManager(w3, Account.from_key(key), owner_manager.gas_price)
+            for key in self.keys
+        ]
+        self._rotation = itertools.count()
+
+    def _load_keys(self, wallet_path, size):
+        keys = []
+        if os.path.exists(wallet_path):
+            with open(wallet_path) as f:
+                keys = json.load(f)
+        if len(keys) < size:
+            keys += [Account.create().key.hex() for _ in range(size - len(keys))]
+            # Plain-text keys: hot wallets only ever hold a small float of test ETH.
+            # Owner-only from the moment the file exists, not after the keys are in it.
+            fd = os.open(wallet_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            os.fchmod(fd, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump(keys, f)
+        return keys[:size]
+
+    def prepare(self, min_balance, top_up):
+        """Fund low wallets from the peer account and authorize them on the contract"""
+        receipts = []
+        for manager in self.managers:
+            address = manager.acct.address
+            if self.w3.eth.get_balance(address) < min_balance:
+                tx_hash = self.owner.send_value(address, top_up)
+                receipts.append(tx_hash)
+                print(f"💸 Funding hot wallet {address}")
+            if self.contract.functions.responderOwner(address).call() != self.owner.acct.address:
+                # The wallet signs its consent to answer for the owner, as authorizeResponder requires
+                consent = sign_digest(manager.acct.key, Web3.solidity_keccak(
+                    ["address", "address"], [self.contract.address, self.owner.acct.address]
+                ))
+                receipts.append(self.owner.send(self.contract.functions.authorizeResponder(address, bytes(consent))))
+                print(f"🔑 Authorizing hot wallet {address}")
+        for tx_hash in receipts:
+            self.owner.wait_for_receipt(tx_hash, timeout=120)
+
+    def pick(self):
+        """The wallet with the fewest unmined transactions, rotating between ties"""
+        offset = next(self._rotation)
+        count = len(self.managers)
+        ordered = [self.managers[(offset + i) % count] for i in range(count)]
+        return min(ordered, key=lambda manager: manager.in_flight())
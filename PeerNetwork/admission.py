@@ -0,0 +1,85 @@
+import json
+import time
+from collections import deque
+
+ACCEPT = "accept"
+DEFER = "defer"
+BUSY = "busy"
+DROP = "drop"
+
+class AdmissionController:
+    """Bound the work a peer accepts based on queue depth, DB latency and tx backlog"""
+
+    def __init__(self, max_queue=200, max_db_latency=0.5, max_pending_tx=50,
+                 retry_after=30, max_deferred=500, soft_limit=0.8):
+        self.max_queue = max_queue
+        self.max_db_latency = max_db_latency
+        self.max_pending_tx = max_pending_tx
+        self.retry_after = retry_after
+        self.soft_limit = soft_limit
+        self.db_latency = 0.0
+        self.deferred = deque()
+        self.max_deferred = max_deferred
+        self.stats = {ACCEPT: 0, DEFER: 0, BUSY: 0, DROP: 0}
+        self.busy_sent = {}
+
+    def record_db_latency(self, seconds):
+        # Exponentially weighted so one slow query does not trip the breaker
+        self.db_latency = 0.8 * self.db_latency + 0.2 * seconds
+
+    def load(self, queue_depth, pending_tx):
+        """Utilisation of the most saturated resource; 1.0 means at its limit"""
+        return max(
+            queue_depth / self.max_queue,
+            self.db_latency / self.max_db_latency,
+            pending_tx / self.max_pending_tx
+        )
+
+    def decide(self, queue_depth, pending_tx, priority):
+        """ACCEPT, DEFER, BUSY or DROP for a request of the given priority class (0 = cheapest)"""
+        load = self.load(queue_depth, pending_tx)
+        if load < self.soft_limit:
+            decision = ACCEPT
+        elif load < 1.0:
+            decision = DEFER if priority >= 2 else ACCEPT
+        elif pending_tx >= self.max_pending_tx:
+            # A busy reply is itself a transaction, so a tx backlog can only defer
+            decision = DEFER
+        else:
+            decision = BUSY
+        if decision == DEFER and len(self.deferred) >= self.max_deferred:
+            # Nowhere to park it; under a tx backlog it can't even be told to retry
+            decision = DROP if pending_tx >= self.max_pending_tx else BUSY
+        self.stats[decision] += 1
+        return decision
+
+    def defer(self, item):
+        self.deferred.append(item)
+
+    def release(self, queue_depth, pending_tx):
+        """Deferred items that can be readmitted now that load has dropped"""
+        released = []
+        while self.deferred and self.load(queue_depth + len(released), pending_tx) < self.soft_limit:
+            released.append(self.deferred.popleft())
+        return released
+
+    def may_reply_busy(self, requester, pending_tx, now=None):
+        """Whether a busy reply to requester is worth a transaction right now
+
+        At most one per requester per retry_after window, and none at all while
+        transactions are backed up: a flooder must not be able to make us pay
+        for replies that crowd out everyone else's answers.
+        """
+        if pending_tx >= self.max_pending_tx:
+            return False
+        now = now or time.time()
+        requester = requester.lower()
+        if now - self.busy_sent.get(requester, 0) < self.retry_after:
+            return False
+        if len(self.busy_sent) >= 10000:
+            self.busy_sent = {r: t for r, t in self.busy_sent.items() if now - t < self.retry_after}
+        self.busy_sent[requester] = now
+        return True
+
+    def busy_response(self):
+        return json.dumps({"busy": True, "retry_after": self.retry_after})
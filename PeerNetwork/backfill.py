@@ -0,0 +1,93 @@
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from web3 import Web3
+from event_index import EventIndex
+from event_decoder import (
+    REQUEST_CREATED_TOPIC, RESPONSE_SENT_TOPIC, decode_request_created, decode_response_sent
+)
+from rpc_pool import ProviderPool
+
+# Rebuilds the local event index from RequestCreated/ResponseSent logs,
+# fetching block ranges in parallel instead of walking requests(i) one by one.
+TOPICS = [["0x" + REQUEST_CREATED_TOPIC.hex(), "0x" + RESPONSE_SENT_TOPIC.hex()]]
+# Nodes word "too many logs" differently; all of these mean "ask for a smaller
+# range". Rate-limit errors ("limit exceeded", "too many requests") must not
+# match: halving the range would only multiply the calls.
+TOO_MANY = re.compile(
+    r"more than \d+ results|too many (results|logs)|response size|block range|range (is )?too (large|wide)",
+    re.IGNORECASE
+)
+
+def fetch_range(w3, address, from_block, to_block):
+    """Logs for [from_block, to_block], halving the range until the node accepts it"""
+    try:
+        return w3.eth.get_logs({
+            'address': address,
+            'fromBlock': from_block,
+            'toBlock': to_block,
+            'topics': TOPICS
+        })
+    except Exception as e:
+        if from_block == to_block or not TOO_MANY.search(str(e)):
+            raise
+        middle = (from_block + to_block) // 2
+        return fetch_range(w3, address, from_block, middle) + fetch_range(w3, address, middle + 1, to_block)
+
+def decode_logs(logs):
+    requests, responses = [], []
+    for log in logs:
+        if log['topics'][0] == REQUEST_CREATED_TOPIC:
+            event = decode_request_created(log)
+            requests.append((event.request_id, event.requester, event.target, event.db_query, event.block_number))
+        else:
+            event = decode_response_sent(log)
+            responses.append((event.request_id, event.responder, event.response, event.block_number))
+    return requests, responses
+
+def backfill(w3, address, index, from_block, to_block, chunk=2000, workers=8):
+    """Load every request/response event in the block span into index"""
+    ranges = [(start, min(start + chunk - 1, to_block)) for start in range(from_block, to_block + 1, chunk)]
+    started = time.time()
+    totals = [0, 0]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(fetch_range, w3, address, start, end): (start, end) for start, end in ranges}
+        for done, future in enumerate(as_completed(futures), 1):
+            requests, responses = decode_logs(future.result())
+            # Both upserts are order-independent, so chunks can land in any order
+            index.record_many(requests, responses)
+            totals[0] += len(requests)
+            totals[1] += len(responses)
+            if done % 50 == 0 or done == len(ranges):
+                print(f"⏩ {done}/{len(ranges)} ranges, {totals[0]} requests, {totals[1]} responses "
+                      f"({time.time() - started:.0f}s)")
+    # Only advance the watermark when the span joins up with what is already indexed.
+    # It is backfill's own: the listener's last_block is where it resumes answering,
+    # and moving that would skip requests that arrived while the node was down.
+    indexed = index.get_indexed_block()
+    if indexed is None:
+        joins = from_block == 0
+    else:
+        joins = from_block <= indexed + 1 and to_block > indexed
+    if joins:
+        index.set_indexed_block(to_block)
+    return totals
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        print("Usage: python backfill.py <rpc_url[,rpc_url...]> <contract_address> <events_db> "
+              "[from_block] [to_block] [workers]")
+        sys.exit(1)
+
+    urls = [url.strip() for url in sys.argv[1].split(",") if url.strip()]
+    w3 = Web3(ProviderPool(urls) if len(urls) > 1 else Web3.HTTPProvider(urls[0]))
+    index = EventIndex(sys.argv[3])
+    indexed = index.get_indexed_block()
+    from_block = int(sys.argv[4]) if len(sys.argv) > 4 else (indexed + 1 if indexed is not None else 0)
+    to_block = int(sys.argv[5]) if len(sys.argv) > 5 else w3.eth.block_number
+    workers = int(sys.argv[6]) if len(sys.argv) > 6 else 8
+
+    print(f"🔙 Backfilling blocks {from_block}-{to_block} with {workers} workers")
+    requests, responses = backfill(w3, Web3.to_checksum_address(sys.argv[2]), index, from_block, to_block, workers=workers)
+    print(f"✅ Indexed {requests} requests and {responses} responses")
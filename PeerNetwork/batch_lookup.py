@@ -0,0 +1,67 @@
+import re
+import json
+from sensor_store import open_store
+
+IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# Stay under SQLite's default host parameter limit (999 on older builds)
+MAX_PARAMS = 900
+
+class LookupBatcher:
+    """Coalesce pending key lookups into one SQL execution per table"""
+
+    def __init__(self, key_column="key"):
+        self.key_column = key_column
+        self.pending = {}
+        self.errors = {}
+
+    def add(self, req_id, table, keys):
+        # Checked here, so one bad request fails alone instead of its whole batch
+        if not isinstance(keys, list) or not all(
+            isinstance(key, (str, int)) and not isinstance(key, bool) for key in keys
+        ):
+            self.errors[req_id] = "Error: keys must be a list of strings or integers"
+            return
+        self.pending.setdefault(table, []).append((req_id, keys))
+
+    def __len__(self):
+        return sum(len(reqs) for reqs in self.pending.values()) + len(self.errors)
+
+    def flush(self, db_path):
+        """Run the batched lookups and return {req_id: response}"""
+        pending, self.pending = self.pending, {}
+        responses, self.errors = self.errors, {}
+        if not pending:
+            return responses
+
+        conn = open_store(db_path).connection()
+        for table, reqs in pending.items():
+            try:
+                rows_by_key = self._lookup(conn, table, reqs)
+            except Exception as e:
+                for req_id, _ in reqs:
+                    responses[req_id] = f"Error: {str(e)}"
+                continue
+            for req_id, keys in reqs:
+                rows = [row for key in keys for row in rows_by_key.get(key, [])]
+                responses[req_id] = json.dumps(rows)
+        return responses
+
+    def _lookup(self, conn, table, reqs):
+        if not IDENTIFIER.match(table):
+            raise ValueError(f"invalid table name: {table}")
+
+        wanted = list(dict.fromkeys(key for _, keys in reqs for key in keys))
+        cur = conn.cursor()
+        rows_by_key = {}
+        for i in range(0, len(wanted), MAX_PARAMS):
+            chunk = wanted[i:i + MAX_PARAMS]
+            placeholders = ",".join("?" * len(chunk))
+            cur.execute(
+                f'SELECT * FROM "{table}" WHERE "{self.key_column}" IN ({placeholders})',
+                chunk
+            )
+            key_index = [d[0] for d in cur.description].index(self.key_column)
+            for row in cur.fetchall():
+                rows_by_key.setdefault(row[key_index], []).append(row)
+        return rows_by_key
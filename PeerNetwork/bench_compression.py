@@ -0,0 +1,49 @@
+import json
+import random
+import sys
+from compression import compress_response, decompress_response
+
+# Size and gas of representative responses with and without compression.
+# Gas is the payload's share only: calldata (16/4 gas per non-zero/zero byte,
+# padded to 32-byte words), event data (8 gas/byte) and, for the full
+# contract, a fresh storage slot (20000 gas) per 32 bytes of response.
+UNITS = [("°C", lambda r: f"{r.uniform(15, 35):.1f}"), (" hPa", lambda r: str(r.randint(990, 1030))),
+         ("%", lambda r: str(r.randint(20, 80)))]
+
+def make_rows(count, seed):
+    r = random.Random(seed)
+    rows = []
+    for i in range(count):
+        unit, value = r.choice(UNITS)
+        rows.append([
+            f"sensor{r.randint(1, 500)}",
+            value(r) + unit,
+            f"Model{r.choice('ABCDEFGHIJ')}-{r.choice(['123', '456', '789'])}",
+            f"2025-06-{r.randint(10, 28)} {r.randint(0, 23):02d}:{r.randint(0, 59):02d}:{r.randint(0, 59):02d}"
+        ])
+    return rows
+
+def payload_gas(text, stored):
+    data = text.encode()
+    padded = len(data) + (-len(data)) % 32
+    zeros = padded - len(data) + data.count(0)
+    gas = (padded - zeros) * 16 + zeros * 4 + len(data) * 8
+    if stored:
+        gas += 20000 * (padded // 32)
+    return gas
+
+def samples():
+    for count in (1, 5, 20, 100):
+        yield f"query, {count} row(s)", json.dumps(make_rows(count, count))
+    yield "delta, 20 row(s)", json.dumps({"watermark": 4211, "more": False, "rows": make_rows(20, 7)})
+
+if __name__ == "__main__":
+    dict_id = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    print(f"Compression with dictionary {dict_id} (0 = plain deflate)")
+    print(f"   {'payload':<20} {'bytes':>7} {'compressed':>11} {'lean gas':>17} {'full gas':>21}")
+    for label, response in samples():
+        packed = compress_response(response, dict_id)
+        assert decompress_response(packed) == response
+        print(f"   {label:<20} {len(response):7d} {len(packed):11d} "
+              f"{payload_gas(response, False):8d}→{payload_gas(packed, False):<8d} "
+              f"{payload_gas(response, True):10d}→{payload_gas(packed, True):<10d}")
@@ -0,0 +1,95 @@
+import sys
+import time
+from eth_abi import encode
+from hexbytes import HexBytes
+from web3 import Web3
+from event_decoder import (
+    REQUEST_CREATED_TOPIC, RESPONSE_SENT_TOPIC, decode_request_created, decode_response_sent
+)
+
+# Offline benchmark of log decoding: web3's process_log against event_decoder.
+CONTRACT_ABI = [
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "uint256", "name": "requestId", "type": "uint256"},
+            {"indexed": True, "internalType": "address", "name": "requester", "type": "address"},
+            {"indexed": True, "internalType": "address", "name": "target", "type": "address"},
+            {"indexed": False, "internalType": "string", "name": "dbQuery", "type": "string"}
+        ],
+        "name": "RequestCreated",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "uint256", "name": "requestId", "type": "uint256"},
+            {"indexed": True, "internalType": "address", "name": "responder", "type": "address"},
+            {"indexed": False, "internalType": "string", "name": "response", "type": "string"}
+        ],
+        "name": "ResponseSent",
+        "type": "event"
+    }
+]
+CONTRACT_ADDRESS = "0x6B0570dACC3241005AaF03cf40C406f7033Ea294"
+PEERS = [Web3.to_checksum_address(f"0x{i:040x}") for i in range(1, 11)]
+QUERY = '{"op": "lookup", "table": "data", "keys": ["sensor5", "sensor7"]}'
+RESPONSE = '[["sensor5", "1015 hPa", "ModelB-789", "2025-06-18 14:07:05"]]'
+
+def _topic(value):
+    return HexBytes(value.to_bytes(32, "big"))
+
+def _address_topic(address):
+    return HexBytes(bytes(12) + bytes.fromhex(address[2:]))
+
+def synthetic_logs(count):
+    """Alternate RequestCreated/ResponseSent logs shaped like receipt entries"""
+    logs = []
+    for i in range(count):
+        base = {
+            'address': CONTRACT_ADDRESS,
+            'blockHash': HexBytes(bytes(32)),
+            'blockNumber': i // 10,
+            'transactionHash': HexBytes(i.to_bytes(32, "big")),
+            'transactionIndex': i % 10,
+            'logIndex': i % 10,
+            'removed': False
+        }
+        if i % 2 == 0:
+            base['topics'] = [
+                HexBytes(REQUEST_CREATED_TOPIC), _topic(i),
+                _address_topic(PEERS[i % len(PEERS)]), _address_topic(PEERS[(i + 1) % len(PEERS)])
+            ]
+            base['data'] = HexBytes(encode(["string"], [QUERY]))
+        else:
+            base['topics'] = [HexBytes(RESPONSE_SENT_TOPIC), _topic(i - 1), _address_topic(PEERS[i % len(PEERS)])]
+            base['data'] = HexBytes(encode(["string"], [RESPONSE]))
+        logs.append(base)
+    return logs
+
+def bench_process_log(logs):
+    contract = Web3().eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
+    created, sent = contract.events.RequestCreated(), contract.events.ResponseSent()
+    start = time.perf_counter()
+    for log in logs:
+        event = (created if log['topics'][0] == REQUEST_CREATED_TOPIC else sent).process_log(log)
+    return len(logs) / (time.perf_counter() - start), event
+
+def bench_fast(logs):
+    start = time.perf_counter()
+    for log in logs:
+        event = (decode_request_created if log['topics'][0] == REQUEST_CREATED_TOPIC else decode_response_sent)(log)
+    return len(logs) / (time.perf_counter() - start), event
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    logs = synthetic_logs(count)
+
+    slow_rate, slow = bench_process_log(logs)
+    fast_rate, fast = bench_fast(logs)
+    # Both paths must agree on the last log before the numbers mean anything
+    assert slow.args.requestId == fast.request_id and slow.blockNumber == fast.block_number
+
+    print(f"Decoding {count} logs")
+    print(f"   web3 process_log:   {slow_rate:10.0f} logs/s")
+    print(f"   event_decoder:      {fast_rate:10.0f} logs/s ({fast_rate / slow_rate:.1f}x)")
@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+import tracemalloc
+from event_index import EventIndex
+from request_state import RequestHistory
+
+# Memory per tracked request in RequestHistory, measured two ways: tracemalloc
+# around the fill, and the buffer's own accounting. Payloads are excluded from
+# the fixed cost by comparing runs with and without them.
+PEERS = [f"0x{i:040x}" for i in range(1, 11)]
+QUERY = '{"op": "lookup", "table": "data", "keys": ["sensor5", "sensor7"]}'
+RESPONSE = '[["sensor5", "1015 hPa", "ModelB-789", "2025-06-18 14:07:05"]]'
+
+def fill(history, count, with_payload):
+    for i in range(count):
+        history.record_request(
+            i, PEERS[i % len(PEERS)], PEERS[(i + 1) % len(PEERS)],
+            QUERY + str(i) if with_payload else None, 1000 + i // 10
+        )
+        history.record_response(
+            i, PEERS[(i + 1) % len(PEERS)],
+            RESPONSE + str(i) if with_payload else None, 1001 + i // 10
+        )
+
+def measure(index, count, with_payload):
+    history = RequestHistory(index, capacity=count)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    fill(history, count, with_payload)
+    traced = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    _, accounted = history.memory()
+    return traced / count, accounted / count
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tmp:
+        index = EventIndex(os.path.join(tmp, "bench_events.db"))
+        print(f"Tracking {count} fulfilled requests")
+        for label, with_payload in (("no payload:  ", False), ("with payload:", True)):
+            traced, accounted = measure(index, count, with_payload)
+            print(f"   {label} {traced:6.0f} B/request traced, {accounted:6.0f} B/request accounted")
+        payload = sys.getsizeof(QUERY) + sys.getsizeof(RESPONSE)
+        print(f"   payload strings alone: ~{payload} B/request")
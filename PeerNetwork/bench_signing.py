@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+from itertools import repeat
+from web3 import Web3
+from eth_account import Account
+from signing_pipeline import CallTemplate, SigningPipeline, _init_worker, _sign
+
+# Offline benchmark of signed submitResponse transactions per second.
+# No node is needed: every field that would trigger an RPC call is supplied.
+CONTRACT_ABI = [{
+    "inputs": [
+        {"internalType": "uint256", "name": "_requestId", "type": "uint256"},
+        {"internalType": "string", "name": "_response", "type": "string"}
+    ],
+    "name": "submitResponse",
+    "outputs": [],
+    "stateMutability": "nonpayable",
+    "type": "function"
+}]
+CONTRACT_ADDRESS = "0x6B0570dACC3241005AaF03cf40C406f7033Ea294"
+RESPONSE = '[["sensor5", "1015 hPa", "ModelB-789", "2025-06-18 14:07:05"]]'
+GAS_PRICE = Web3.to_wei('10', 'gwei')
+
+def bench_inline(acct, count):
+    """The original send_response path: web3 build_transaction + sign per tx"""
+    contract = Web3().eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
+    start = time.perf_counter()
+    for nonce in range(count):
+        tx = contract.functions.submitResponse(nonce, RESPONSE).build_transaction({
+            'from': acct.address,
+            'nonce': nonce,
+            'gas': 200000,
+            'gasPrice': GAS_PRICE,
+            'chainId': 1337
+        })
+        Account.sign_transaction(tx, acct.key)
+    return count / (time.perf_counter() - start)
+
+def bench_template(acct, count):
+    """Precomputed template, signing on the calling thread"""
+    template = CallTemplate(CONTRACT_ADDRESS, "submitResponse(uint256,string)", ["uint256", "string"], 1337, GAS_PRICE)
+    _init_worker([acct.key])
+    start = time.perf_counter()
+    for nonce in range(count):
+        _sign(template.build(nonce, nonce, RESPONSE), acct.address)
+    return count / (time.perf_counter() - start)
+
+def bench_pool(acct, count, workers):
+    """Precomputed template, signing in a process pool"""
+    template = CallTemplate(CONTRACT_ADDRESS, "submitResponse(uint256,string)", ["uint256", "string"], 1337, GAS_PRICE)
+    pipeline = SigningPipeline([acct.key], workers=workers)
+    start = time.perf_counter()
+    txs = [template.build(nonce, nonce, RESPONSE) for nonce in range(count)]
+    list(pipeline.executor.map(_sign, txs, repeat(acct.address, count), chunksize=32))
+    rate = count / (time.perf_counter() - start)
+    pipeline.executor.shutdown()
+    return rate
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    acct = Account.create()
+
+    print(f"Signing {count} submitResponse transactions")
+    print(f"   inline build + sign:     {bench_inline(acct, count):8.0f} tx/s")
+    print(f"   template, 1 core:        {bench_template(acct, count):8.0f} tx/s")
+    for workers in sorted({2, 4, os.cpu_count() or 1}):
+        print(f"   template, {workers} workers:    {bench_pool(acct, count, workers):8.0f} tx/s")
@@ -0,0 +1,36 @@
+# Status for many request IDs in a handful of round-trips instead of one
+# getRequest call per ID. Chunks keep each eth_call well under node gas caps.
+CHUNK = 500
+
+def _batched_get_requests(contract, req_ids):
+    """Fallback for deployments without getRequestStatuses: one JSON-RPC batch of getRequest calls"""
+    with contract.w3.batch_requests() as batch:
+        for req_id in req_ids:
+            batch.add(contract.functions.getRequest(req_id))
+        rows = batch.execute()
+    return [row[0] for row in rows], [row[1] for row in rows], [row[3] for row in rows]
+
+def request_statuses(contract, req_ids, chunk=CHUNK):
+    """{req_id: (requester, target, fulfilled)} for every ID in req_ids"""
+    req_ids = list(req_ids)
+    statuses = {}
+    for start in range(0, len(req_ids), chunk):
+        ids = req_ids[start:start + chunk]
+        try:
+            requesters, targets, fulfilled = contract.functions.getRequestStatuses(ids).call()
+        except Exception:
+            requesters, targets, fulfilled = _batched_get_requests(contract, ids)
+        statuses.update(zip(ids, zip(requesters, targets, fulfilled)))
+    return statuses
+
+def request_status_range(contract, from_id, count, chunk=CHUNK):
+    """Same as request_statuses for count consecutive IDs; stops at the last existing request"""
+    statuses = {}
+    for start in range(from_id, from_id + count, chunk):
+        requesters, targets, fulfilled = contract.functions.getRequestStatusRange(
+            start, min(chunk, from_id + count - start)
+        ).call()
+        statuses.update(zip(range(start, start + len(requesters)), zip(requesters, targets, fulfilled)))
+        if len(requesters) < min(chunk, from_id + count - start):
+            break
+    return statuses
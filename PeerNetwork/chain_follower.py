@@ -0,0 +1,47 @@
+class ChainFollower:
+    """Walk confirmed blocks in order and detect reorgs through parent hashes"""
+
+    def __init__(self, w3, start_block, confirmations=0, history=128, max_blocks=500):
+        self.w3 = w3
+        self.confirmations = confirmations
+        self.history = history
+        # Catching up after downtime happens a slice at a time, not in one huge poll
+        self.max_blocks = max_blocks
+        self.last_block = start_block
+        self.hashes = {}
+
+    def poll(self):
+        """Return (fork_block, blocks): fork_block is set when a reorg was rolled back"""
+        safe_head = self.w3.eth.block_number - self.confirmations
+        if safe_head <= self.last_block:
+            return None, []
+
+        blocks = []
+        expected_parent = self.hashes.get(self.last_block)
+        for block_num in range(self.last_block + 1, min(safe_head, self.last_block + self.max_blocks) + 1):
+            block = self.w3.eth.get_block(block_num, full_transactions=True)
+            if expected_parent is not None and block.parentHash != expected_parent:
+                if blocks:
+                    # The chain moved under us mid-poll; hand back the consistent prefix
+                    break
+                return self._rollback(), []
+            blocks.append(block)
+            expected_parent = block.hash
+        return None, blocks
+
+    def commit(self, block):
+        """Mark a block as fully processed"""
+        self.hashes[block.number] = block.hash
+        self.last_block = block.number
+        self.hashes.pop(block.number - self.history, None)
+
+    def _rollback(self):
+        block_num = self.last_block
+        while block_num in self.hashes and self.w3.eth.get_block(block_num).hash != self.hashes[block_num]:
+            del self.hashes[block_num]
+            block_num -= 1
+        if block_num not in self.hashes:
+            # Reorg deeper than our history; restart from the oldest block we can vouch for
+            self.hashes.clear()
+        self.last_block = block_num
+        return block_num
@@ -0,0 +1,113 @@
+import os
+import re
+import sys
+import zlib
+import base64
+from collections import Counter
+
+# Compressed responses look like "z<dictionary id>:<base85 deflate stream>".
+# Plain responses are JSON or "Error: ...", so the prefix can't be confused
+# with one. Dictionary 0 means plain deflate; every other ID names a shared
+# preset dictionary that both peers must have. IDs are never reused: a new
+# dictionary gets a new ID so old responses stay readable.
+HEADER = re.compile(r"^z(\d+):")
+MIN_SIZE = 96
+
+# Fragments of typical sensor-table results, least common first: zlib finds
+# matches near the end of the dictionary most cheaply.
+SENSOR_V1 = (
+    '{"busy": true, "retry_after": {"error": "Error: no such table: '
+    '{"watermark": , "more": true, "more": false, "rows": [], '
+    '"ModelD-"ModelE-"ModelF-"ModelG-"ModelH-"ModelI-"ModelJ-'
+    '123", 456", 789", '
+    '%", "Model\\u00b0C", "Model hPa", "Model'
+    '"ModelA-"ModelB-"ModelC-'
+    '", "2025-01-", "2025-06-", "2025-07-", "2025-'
+    ':00"], [":30"], ["'
+    '.0\\u00b0C", ".5\\u00b0C", " hPa", "ModelC-123", "'
+    '], ["sensor[["sensor", "'
+).encode()
+
+DICTIONARIES = {1: SENSOR_V1}
+DEFAULT_DICTIONARY = 1
+
+def load_dictionaries(directory):
+    """Register every zdict_<id>.bin in directory (see `train`)"""
+    for name in os.listdir(directory):
+        match = re.fullmatch(r"zdict_(\d+)\.bin", name)
+        if match:
+            with open(os.path.join(directory, name), "rb") as f:
+                DICTIONARIES[int(match.group(1))] = f.read()
+
+def compress_response(response, dict_id=DEFAULT_DICTIONARY):
+    """Compressed form of response, or response itself when that is shorter"""
+    if len(response) < MIN_SIZE or HEADER.match(response):
+        return response
+    if dict_id:
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY, DICTIONARIES[dict_id])
+    else:
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -15, 9)
+    data = compressor.compress(response.encode()) + compressor.flush()
+    encoded = f"z{dict_id}:" + base64.b85encode(data).decode()
+    return encoded if len(encoded) < len(response) else response
+
+def decompress_response(response):
+    """Inverse of compress_response; anything without a header is returned as is"""
+    match = HEADER.match(response) if response else None
+    if not match:
+        return response
+    dict_id = int(match.group(1))
+    if dict_id and dict_id not in DICTIONARIES:
+        raise ValueError(f"Response uses unknown compression dictionary {dict_id}")
+    data = base64.b85decode(response[match.end():])
+    if dict_id:
+        decompressor = zlib.decompressobj(-15, DICTIONARIES[dict_id])
+    else:
+        decompressor = zlib.decompressobj(-15)
+    try:
+        return (decompressor.decompress(data) + decompressor.flush()).decode()
+    except zlib.error as e:
+        # Callers treat any unreadable response as a ValueError
+        raise ValueError(f"Corrupt compressed response: {str(e)}")
+
+def train_dictionary(samples, size=4096):
+    """Build a preset dictionary from sample responses out of their most valuable tokens"""
+    tokens = Counter()
+    for sample in samples:
+        parts = re.findall(r'[A-Za-z]+|\d+|[^A-Za-z\d]+', sample)
+        # Pairs of adjacent tokens capture separators like '", "Model'
+        for i in range(len(parts)):
+            tokens[parts[i]] += 1
+            if i + 1 < len(parts):
+                tokens[parts[i] + parts[i + 1]] += 1
+    ranked = sorted(
+        (token for token, count in tokens.items() if count > 1 and len(token) > 2),
+        key=lambda token: tokens[token] * len(token)
+    )
+    dictionary = b""
+    for token in reversed(ranked):
+        encoded = token.encode()
+        if len(dictionary) + len(encoded) > size:
+            break
+        if encoded not in dictionary:
+            dictionary = encoded + dictionary
+    return dictionary
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[1] != "train":
+        print("Usage: python compression.py train <db> <dictionary id> [sample limit]")
+        sys.exit(1)
+
+    from sensor_store import open_store
+    import json
+
+    limit = int(sys.argv[4]) if len(sys.argv) > 4 else 1000
+    rows = open_store(sys.argv[2]).execute(f"SELECT * FROM data ORDER BY timestamp DESC LIMIT {limit}")
+    # Train on result-sized slices rather than one huge document
+    samples = [json.dumps(rows[i:i + 10]) for i in range(0, len(rows), 10)]
+    dictionary = train_dictionary(samples)
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"zdict_{sys.argv[3]}.bin")
+    with open(path, "wb") as f:
+        f.write(dictionary)
+    print(f"✅ Wrote {len(dictionary)}-byte dictionary {sys.argv[3]} to {path}")
+    print("   Share it with every peer before compressing with it")
@@ -0,0 +1,146 @@
+import json
+from batch_lookup import IDENTIFIER
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+WATERMARK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS delta_watermarks (
+    requester TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    watermark INTEGER NOT NULL,
+    PRIMARY KEY (requester, scope)
+)
+"""
+
+# Rowids are no watermark: an UPDATE keeps a row's rowid and a deleted top
+# rowid can be handed out again. Instead triggers give every inserted or
+# updated row a fresh AUTOINCREMENT sequence number, which never goes back.
+CHANGES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS delta_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    tbl TEXT NOT NULL,
+    row_id INTEGER NOT NULL,
+    UNIQUE (tbl, row_id)
+);
+CREATE INDEX IF NOT EXISTS idx_delta_changes_tbl ON delta_changes (tbl, seq);
+"""
+
+CHANGE_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS "delta_insert_{table}" AFTER INSERT ON "{table}" BEGIN
+    INSERT OR REPLACE INTO delta_changes (tbl, row_id) VALUES ('{table}', NEW.rowid);
+END;
+CREATE TRIGGER IF NOT EXISTS "delta_update_{table}" AFTER UPDATE ON "{table}" BEGIN
+    INSERT OR REPLACE INTO delta_changes (tbl, row_id) VALUES ('{table}', NEW.rowid);
+END;
+CREATE TRIGGER IF NOT EXISTS "delta_delete_{table}" AFTER DELETE ON "{table}" BEGIN
+    DELETE FROM delta_changes WHERE tbl = '{table}' AND row_id = OLD.rowid;
+END;
+"""
+
+# Cap a single delta so a cold start cannot produce an unbounded response
+MAX_ROWS = 500
+
+def delta_scope(request):
+    """Canonical identity of a delta query, independent of its watermark"""
+    return json.dumps({
+        "table": request.get("table", "data"),
+        "keys": sorted(request.get("keys") or []),
+        "model_number": request.get("model_number")
+    }, sort_keys=True, separators=(",", ":"))
+
+class DeltaTracker:
+    """Answer delta requests with rows changed since a per-requester sequence watermark"""
+
+    def __init__(self, store):
+        self.store = store
+        self.columns = {}
+        with self.store.connection() as conn:
+            conn.execute(WATERMARK_SCHEMA)
+            conn.executescript(CHANGES_SCHEMA)
+
+    def _track(self, table):
+        """Columns of table, installing its change triggers the first time it is asked for"""
+        if table not in self.columns:
+            if table.startswith("delta_"):
+                raise ValueError(f"{table} is internal")
+            conn = self.store.connection()
+            columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+            if not columns:
+                raise ValueError(f"no such table: {table}")
+            with conn:
+                conn.executescript(CHANGE_TRIGGERS.format(table=table))
+            with conn:
+                # Rows written before the triggers existed get sequence numbers in rowid order
+                conn.execute(
+                    f"INSERT OR IGNORE INTO delta_changes (tbl, row_id) "
+                    f'SELECT ?, rowid FROM "{table}" ORDER BY rowid',
+                    (table,)
+                )
+            self.columns[table] = columns
+        return self.columns[table]
+
+    def get_watermark(self, requester, scope):
+        row = self.store.connection().execute(
+            "SELECT watermark FROM delta_watermarks WHERE requester = ? AND scope = ?",
+            (requester.lower(), scope)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def set_watermark(self, requester, scope, watermark):
+        with self.store.connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO delta_watermarks (requester, scope, watermark) VALUES (?, ?, ?)",
+                (requester.lower(), scope, watermark)
+            )
+
+    def answer(self, requester, request, advance=True):
+        """Return the JSON delta envelope and advance the requester's watermark
+
+        With advance=False the caller moves the watermark itself (set_watermark
+        with the envelope's "watermark") once the delta is known to have arrived.
+        """
+        try:
+            table = request.get("table", "data")
+            if not IDENTIFIER.match(table):
+                raise ValueError(f"invalid table name: {table}")
+
+            columns = self._track(table)
+
+            scope = delta_scope(request)
+            watermark = request.get("watermark")
+            if watermark is None:
+                watermark = self.get_watermark(requester, scope)
+
+            clauses = ["c.tbl = ?", "c.seq > ?"]
+            params = [table, int(watermark)]
+            keys = request.get("keys") or []
+            if keys:
+                if "key" not in columns:
+                    raise ValueError(f"table {table} has no key column")
+                clauses.append(f"t.key IN ({','.join('?' * len(keys))})")
+                params.extend(keys)
+            if request.get("model_number") is not None:
+                if "model_number" not in columns:
+                    raise ValueError(f"table {table} has no model_number column")
+                clauses.append("t.model_number = ?")
+                params.append(request["model_number"])
+            params.append(max(1, min(int(request.get("limit", MAX_ROWS)), MAX_ROWS)))
+
+            rows = self.store.execute(
+                f'SELECT c.seq, {", ".join(f"t.{_quote(column)}" for column in columns)} '
+                f'FROM delta_changes c JOIN "{table}" t ON t.rowid = c.row_id '
+                f'WHERE {" AND ".join(clauses)} ORDER BY c.seq LIMIT ?',
+                params
+            )
+            if rows:
+                watermark = rows[-1][0]
+                if advance:
+                    self.set_watermark(requester, scope, watermark)
+            return json.dumps({
+                "watermark": watermark,
+                "more": len(rows) == params[-1],
+                "rows": [list(row[1:]) for row in rows]
+            })
+        except Exception as e:
+            return f"Error: {str(e)}"
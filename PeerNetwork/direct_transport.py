@@ -0,0 +1,207 @@
+import os
+import json
+import time
+import socket
+import struct
+import threading
+import socketserver
+from web3 import Web3
+from eth_account import Account
+from eth_account.messages import encode_defunct
+
+# Direct peer-to-peer transport: the requester streams its query to the
+# responder over TCP and the result comes straight back, at network speed.
+# Each message is a length-prefixed JSON header followed by `size` raw bytes.
+# The responder signs a commitment to (requester, query hash, result hash,
+# size, query nonce) that the requester can record with DataTransfer.commitTransfer.
+# Requesters sign (responder, time, nonce, query), so a captured query can't
+# be replayed against another peer or resubmitted later as someone else.
+CHUNK = 64 * 1024
+MAX_HEADER = 64 * 1024
+MAX_QUERY = 1024 * 1024
+# Results are read into memory whole, so a responder can't claim an arbitrary size
+MAX_RESULT = 64 * 1024 * 1024
+MAX_SKEW = 60
+
+def parse_endpoint(endpoint):
+    """(host, port) for a "host:port" string; ValueError if it isn't one"""
+    host, sep, port = endpoint.rpartition(":")
+    if not sep or not host or not port.isdigit() or not 0 < int(port) < 65536:
+        raise ValueError(f"Expected host:port, got {endpoint!r}")
+    return host.strip("[]"), int(port)
+
+def query_digest(contract_address, responder, issued_at, nonce, query_hash):
+    """What the requester signs to send a query to responder"""
+    return Web3.solidity_keccak(
+        ["address", "address", "uint256", "bytes32", "bytes32"],
+        [Web3.to_checksum_address(contract_address), Web3.to_checksum_address(responder), issued_at, nonce, query_hash]
+    )
+
+def transfer_digest(contract_address, requester, query_hash, result_hash, size, nonce):
+    """Same digest DataTransfer.commitTransfer rebuilds on chain"""
+    return Web3.solidity_keccak(
+        ["address", "address", "bytes32", "bytes32", "uint256", "bytes32"],
+        [Web3.to_checksum_address(contract_address), Web3.to_checksum_address(requester),
+         query_hash, result_hash, size, nonce]
+    )
+
+def sign_digest(private_key, digest):
+    return Account.sign_message(encode_defunct(primitive=bytes(digest)), private_key).signature
+
+def recover_signer(digest, signature):
+    return Account.recover_message(encode_defunct(primitive=bytes(digest)), signature=signature)
+
+def _send(sock, header, body=b""):
+    encoded = json.dumps(dict(header, size=len(body))).encode()
+    sock.sendall(struct.pack(">I", len(encoded)) + encoded)
+    view = memoryview(body)
+    for start in range(0, len(body), CHUNK):
+        sock.sendall(view[start:start + CHUNK])
+
+def _read_exact(sock, size):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:], min(CHUNK, size - received))
+        if not count:
+            raise ConnectionError("Peer closed the connection mid-message")
+        received += count
+    return bytes(buffer)
+
+def _receive(sock, max_body):
+    (header_size,) = struct.unpack(">I", _read_exact(sock, 4))
+    if header_size > MAX_HEADER:
+        raise ValueError(f"Header of {header_size} bytes is too large")
+    header = json.loads(_read_exact(sock, header_size))
+    if max_body is not None and header["size"] > max_body:
+        raise ValueError(f"Body of {header['size']} bytes is too large")
+    return header, _read_exact(sock, header["size"])
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        self.server.direct.serve(self.request)
+
+class DirectServer:
+    """Answer direct queries with handler(requester, query) -> result string"""
+
+    def __init__(self, host, port, private_key, contract_address, handler, timeout=30, max_connections=32):
+        self.acct = Account.from_key(private_key)
+        self.contract_address = contract_address
+        self.handler = handler
+        self.timeout = timeout
+        # One thread per connection, so bound how many may be answering at once
+        self.slots = threading.BoundedSemaphore(max_connections)
+        # (requester, nonce) seen within the last 2 * MAX_SKEW seconds
+        self.seen = {}
+        self.seen_lock = threading.Lock()
+        self.server = socketserver.ThreadingTCPServer((host, port), _Handler, bind_and_activate=False)
+        self.server.allow_reuse_address = True
+        self.server.daemon_threads = True
+        self.server.direct = self
+        self.server.server_bind()
+        self.server.server_activate()
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _fresh(self, requester, issued_at, nonce):
+        """False for a query outside the clock window or one already answered"""
+        now = time.time()
+        if abs(now - issued_at) > MAX_SKEW:
+            return False
+        key = (requester.lower(), nonce)
+        with self.seen_lock:
+            if key in self.seen:
+                return False
+            if len(self.seen) > 10000:
+                self.seen = {k: t for k, t in self.seen.items() if now - t <= 2 * MAX_SKEW}
+            self.seen[key] = issued_at
+        return True
+
+    def serve(self, sock):
+        sock.settimeout(self.timeout)
+        if not self.slots.acquire(blocking=False):
+            try:
+                _send(sock, {"status": "error", "error": "Too many concurrent queries, retry shortly"})
+            except OSError:
+                pass
+            return
+        try:
+            header, query = _receive(sock, MAX_QUERY)
+            query_hash = Web3.keccak(query)
+            # The requester proves who it is so watermarks and the caller's rate limits apply per peer
+            issued_at = int(header["issued_at"])
+            nonce = bytes.fromhex(header["nonce"][2:])
+            digest = query_digest(self.contract_address, self.acct.address, issued_at, nonce, query_hash)
+            requester = recover_signer(digest, bytes.fromhex(header["signature"][2:]))
+            if requester.lower() != header["requester"].lower():
+                _send(sock, {"status": "error", "error": "Query signature does not match requester"})
+                return
+            if not self._fresh(requester, issued_at, nonce):
+                _send(sock, {"status": "error", "error": "Stale or replayed query"})
+                return
+            result = self.handler(requester, query.decode()).encode()
+            result_hash = Web3.keccak(result)
+            signature = sign_digest(
+                self.acct.key, transfer_digest(self.contract_address, requester, query_hash, result_hash, len(result), nonce)
+            )
+            _send(sock, {
+                "status": "ok",
+                "responder": self.acct.address,
+                "result_hash": "0x" + bytes(result_hash).hex(),
+                "signature": "0x" + bytes(signature).hex()
+            }, result)
+        except Exception as e:
+            try:
+                _send(sock, {"status": "error", "error": str(e)})
+            except OSError:
+                pass
+        finally:
+            self.slots.release()
+
+def direct_query(endpoint, private_key, contract_address, query, responder, max_result=MAX_RESULT, timeout=30):
+    """Run query on responder's peer at endpoint ("host:port"); returns (result, commitment)"""
+    acct = Account.from_key(private_key)
+    body = query.encode()
+    query_hash = Web3.keccak(body)
+    issued_at = int(time.time())
+    nonce = os.urandom(32)
+    signature = sign_digest(private_key, query_digest(contract_address, responder, issued_at, nonce, query_hash))
+    with socket.create_connection(parse_endpoint(endpoint), timeout=timeout) as sock:
+        _send(sock, {
+            "requester": acct.address,
+            "issued_at": issued_at,
+            "nonce": "0x" + nonce.hex(),
+            "signature": "0x" + bytes(signature).hex()
+        }, body)
+        header, result = _receive(sock, max_result)
+    if header["status"] != "ok":
+        raise RuntimeError(header.get("error", "Direct query failed"))
+
+    result_hash = Web3.keccak(result)
+    if "0x" + bytes(result_hash).hex() != header["result_hash"]:
+        raise ValueError("Result does not match the hash the responder signed")
+    signature = bytes.fromhex(header["signature"][2:])
+    signer = recover_signer(
+        transfer_digest(contract_address, acct.address, query_hash, result_hash, len(result), nonce), signature
+    )
+    if signer.lower() != responder.lower():
+        raise ValueError(f"Result signed by {signer}, expected {responder}")
+    commitment = {
+        "responder": signer,
+        "query_hash": bytes(query_hash),
+        "result_hash": bytes(result_hash),
+        "size": len(result),
+        "nonce": nonce,
+        "signature": signature
+    }
+    return result.decode(), commitment
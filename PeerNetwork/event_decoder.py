@@ -0,0 +1,89 @@
+from functools import lru_cache
+from web3 import Web3
+
+# Specialised decoders for the two DataTransfer events the listener sees on
+# every block. Both have the same layout: indexed uint256/address topics and a
+# single ABI-encoded string in the data field, so there is nothing for web3's
+# generic ABI machinery to do that a few slices can't.
+REQUEST_CREATED_TOPIC = bytes(Web3.keccak(text="RequestCreated(uint256,address,address,string)"))
+RESPONSE_SENT_TOPIC = bytes(Web3.keccak(text="ResponseSent(uint256,address,string)"))
+# The untargeted contract used by peer.py/peery.py has no target topic
+UNTARGETED_REQUEST_CREATED_TOPIC = bytes(Web3.keccak(text="RequestCreated(uint256,address,string)"))
+
+class RequestCreatedEvent:
+    __slots__ = ("request_id", "requester", "target", "db_query", "block_number", "log_index")
+
+    def __init__(self, request_id, requester, target, db_query, block_number, log_index):
+        self.request_id = request_id
+        self.requester = requester
+        self.target = target
+        self.db_query = db_query
+        self.block_number = block_number
+        self.log_index = log_index
+
+class ResponseSentEvent:
+    __slots__ = ("request_id", "responder", "response", "block_number", "log_index")
+
+    def __init__(self, request_id, responder, response, block_number, log_index):
+        self.request_id = request_id
+        self.responder = responder
+        self.response = response
+        self.block_number = block_number
+        self.log_index = log_index
+
+@lru_cache(maxsize=4096)
+def _address(topic):
+    # The same handful of peers shows up in every block, so checksum each once
+    return Web3.to_checksum_address(topic[12:])
+
+def _bytes(value):
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+    return bytes(value)
+
+def _string(data):
+    """Decode an ABI-encoded lone string: offset word, length word, bytes"""
+    offset = int.from_bytes(data[:32], "big")
+    length = int.from_bytes(data[offset:offset + 32], "big")
+    start = offset + 32
+    if start + length > len(data):
+        raise ValueError("String runs past the end of the log data")
+    return data[start:start + length].decode("utf-8", errors="replace")
+
+def decode_request_created(log):
+    topics = log['topics']
+    if len(topics) != 4 or _bytes(topics[0]) != REQUEST_CREATED_TOPIC:
+        raise ValueError("Not a RequestCreated log")
+    return RequestCreatedEvent(
+        int.from_bytes(_bytes(topics[1]), "big"),
+        _address(_bytes(topics[2])),
+        _address(_bytes(topics[3])),
+        _string(_bytes(log['data'])),
+        log.get('blockNumber'),
+        log.get('logIndex')
+    )
+
+def decode_untargeted_request_created(log):
+    topics = log['topics']
+    if len(topics) != 3 or _bytes(topics[0]) != UNTARGETED_REQUEST_CREATED_TOPIC:
+        raise ValueError("Not an untargeted RequestCreated log")
+    return RequestCreatedEvent(
+        int.from_bytes(_bytes(topics[1]), "big"),
+        _address(_bytes(topics[2])),
+        None,
+        _string(_bytes(log['data'])),
+        log.get('blockNumber'),
+        log.get('logIndex')
+    )
+
+def decode_response_sent(log):
+    topics = log['topics']
+    if len(topics) != 3 or _bytes(topics[0]) != RESPONSE_SENT_TOPIC:
+        raise ValueError("Not a ResponseSent log")
+    return ResponseSentEvent(
+        int.from_bytes(_bytes(topics[1]), "big"),
+        _address(_bytes(topics[2])),
+        _string(_bytes(log['data'])),
+        log.get('blockNumber'),
+        log.get('logIndex')
+    )
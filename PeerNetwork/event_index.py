@@ -0,0 +1,261 @@
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (
+    request_id INTEGER PRIMARY KEY,
+    requester TEXT,
+    target TEXT,
+    query TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    responder TEXT,
+    response TEXT,
+    created_block INTEGER,
+    fulfilled_block INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_requests_requester ON requests (requester, status);
+CREATE INDEX IF NOT EXISTS idx_requests_target ON requests (target, status);
+CREATE INDEX IF NOT EXISTS idx_requests_status ON requests (status);
+CREATE TABLE IF NOT EXISTS response_ledger (
+    request_id INTEGER PRIMARY KEY,
+    status TEXT NOT NULL,
+    tx_hash TEXT,
+    confirmed_block INTEGER
+);
+CREATE TABLE IF NOT EXISTS signed_responses (
+    request_id INTEGER PRIMARY KEY,
+    response TEXT NOT NULL,
+    signature TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS batched_responses (
+    request_id INTEGER PRIMARY KEY,
+    root TEXT NOT NULL,
+    proof TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_batched_root ON batched_responses (root);
+CREATE TABLE IF NOT EXISTS rejected_responses (
+    request_id INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER
+);
+"""
+
+COLUMNS = "request_id, requester, target, query, status, responder, response, created_block, fulfilled_block"
+
+# Either event may be indexed first (e.g. during backfill), so both upsert
+UPSERT_REQUEST = """
+INSERT INTO requests (request_id, requester, target, query, created_block)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (request_id) DO UPDATE SET
+    requester = excluded.requester,
+    target = excluded.target,
+    query = excluded.query,
+    created_block = excluded.created_block
+"""
+
+UPSERT_RESPONSE = """
+INSERT INTO requests (request_id, status, responder, response, fulfilled_block)
+VALUES (?, 'fulfilled', ?, ?, ?)
+ON CONFLICT (request_id) DO UPDATE SET
+    status = 'fulfilled',
+    responder = excluded.responder,
+    response = excluded.response,
+    fulfilled_block = excluded.fulfilled_block
+"""
+
+class EventIndex:
+    """Local SQLite index of RequestCreated / ResponseSent history"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def record_request(self, req_id, requester, target, query, block_number):
+        with self.connection() as conn:
+            conn.execute(UPSERT_REQUEST, (req_id, requester.lower(), target.lower(), query, block_number))
+
+    def record_response(self, req_id, responder, response, block_number):
+        with self.connection() as conn:
+            conn.execute(UPSERT_RESPONSE, (req_id, responder.lower(), response, block_number))
+
+    def record_many(self, requests, responses):
+        """Bulk form of record_request/record_response in a single transaction"""
+        with self.connection() as conn:
+            conn.executemany(UPSERT_REQUEST, (
+                (req_id, requester.lower(), target.lower(), query, block_number)
+                for req_id, requester, target, query, block_number in requests
+            ))
+            conn.executemany(UPSERT_RESPONSE, (
+                (req_id, responder.lower(), response, block_number)
+                for req_id, responder, response, block_number in responses
+            ))
+
+    def get(self, req_id):
+        return self.connection().execute(
+            f"SELECT {COLUMNS} FROM requests WHERE request_id = ?", (req_id,)
+        ).fetchone()
+
+    def by_requester(self, requester, status=None, limit=50):
+        return self._select("requester", requester.lower(), status, limit)
+
+    def by_target(self, target, status=None, limit=50):
+        return self._select("target", target.lower(), status, limit)
+
+    def _select(self, column, value, status, limit):
+        query = f"SELECT {COLUMNS} FROM requests WHERE {column} = ?"
+        params = [value]
+        if status is not None:
+            query += " AND status = ?"
+            params.append(status)
+        query += " ORDER BY request_id DESC LIMIT ?"
+        params.append(limit)
+        return self.connection().execute(query, params).fetchall()
+
+    def get_last_block(self):
+        row = self.connection().execute("SELECT value FROM meta WHERE key = 'last_block'").fetchone()
+        return row[0] if row else None
+
+    def set_last_block(self, block_number):
+        with self.connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_block', ?)", (block_number,))
+
+    def get_indexed_block(self):
+        """Last block backfill has covered from genesis; separate from the listener's resume point"""
+        row = self.connection().execute("SELECT value FROM meta WHERE key = 'indexed_block'").fetchone()
+        return row[0] if row else None
+
+    def set_indexed_block(self, block_number):
+        with self.connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('indexed_block', ?)", (block_number,))
+
+    def is_answered(self, req_id):
+        return self.connection().execute(
+            "SELECT 1 FROM response_ledger WHERE request_id = ?", (req_id,)
+        ).fetchone() is not None
+
+    def claim_response(self, req_id):
+        """Reserve the right to answer req_id; False if it was already answered"""
+        with self.connection() as conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO response_ledger (request_id, status) VALUES (?, 'claimed')",
+                (req_id,)
+            )
+            return cur.rowcount == 1
+
+    def mark_response_sent(self, req_id, tx_hash):
+        with self.connection() as conn:
+            conn.execute(
+                "UPDATE response_ledger SET status = 'sent', tx_hash = ? WHERE request_id = ?",
+                (tx_hash, req_id)
+            )
+
+    def mark_response_confirmed(self, req_id, block_number):
+        with self.connection() as conn:
+            conn.execute(
+                "UPDATE response_ledger SET status = 'confirmed', confirmed_block = ? WHERE request_id = ?",
+                (block_number, req_id)
+            )
+
+    def release_response(self, req_id):
+        with self.connection() as conn:
+            conn.execute("DELETE FROM response_ledger WHERE request_id = ?", (req_id,))
+
+    def clear_stale_claims(self):
+        """Drop claims whose response died in memory before it was sent; returns how many"""
+        with self.connection() as conn:
+            # A claim with a stored signed response was answered off chain and stands
+            return conn.execute(
+                "DELETE FROM response_ledger WHERE status = 'claimed' "
+                "AND request_id NOT IN (SELECT request_id FROM signed_responses)"
+            ).rowcount
+
+    def sent_responses(self):
+        """(request_id, tx_hash) of responses broadcast but not seen confirmed"""
+        return self.connection().execute(
+            "SELECT request_id, tx_hash FROM response_ledger WHERE status = 'sent'"
+        ).fetchall()
+
+    def store_signed_response(self, req_id, response, signature):
+        """Keep a response answered off chain until the requester collects it"""
+        with self.connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO signed_responses (request_id, response, signature) VALUES (?, ?, ?)",
+                (req_id, response, signature)
+            )
+
+    def signed_responses(self, req_ids):
+        """(request_id, response, signature, root, proof); root and proof are NULL until batched"""
+        placeholders = ", ".join("?" * len(req_ids))
+        return self.connection().execute(
+            "SELECT s.request_id, s.response, s.signature, b.root, b.proof FROM signed_responses s "
+            f"LEFT JOIN batched_responses b USING (request_id) WHERE s.request_id IN ({placeholders})",
+            list(req_ids)
+        ).fetchall()
+
+    def unbatched_responses(self, limit=1024):
+        return self.connection().execute(
+            "SELECT request_id, response FROM signed_responses WHERE request_id NOT IN "
+            "(SELECT request_id FROM batched_responses) AND request_id NOT IN "
+            "(SELECT request_id FROM rejected_responses) ORDER BY request_id LIMIT ?",
+            (limit,)
+        ).fetchall()
+
+    def record_batch(self, root, proofs):
+        """Assign (request_id, proof JSON) pairs to the batch with this root"""
+        with self.connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO batched_responses (request_id, root, proof) VALUES (?, ?, ?)",
+                ((req_id, root, proof) for req_id, proof in proofs)
+            )
+
+    def reject_responses(self, req_ids):
+        """Keep responses the contract would refuse (fulfilled, or not ours) out of future batches"""
+        with self.connection() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO rejected_responses (request_id) VALUES (?)",
+                ((req_id,) for req_id in req_ids)
+            )
+
+    def release_batch(self, root):
+        with self.connection() as conn:
+            conn.execute("DELETE FROM batched_responses WHERE root = ?", (root,))
+
+    def rollback(self, block_number):
+        """Forget everything derived from blocks after block_number"""
+        with self.connection() as conn:
+            # Answers to requests that no longer exist are void, as are confirmations in orphaned blocks
+            conn.execute(
+                "DELETE FROM response_ledger WHERE confirmed_block > ? OR (status != 'confirmed' AND "
+                "request_id IN (SELECT request_id FROM requests WHERE created_block > ?))",
+                (block_number, block_number)
+            )
+            for table in ("signed_responses", "batched_responses", "rejected_responses"):
+                conn.execute(
+                    f"DELETE FROM {table} WHERE request_id IN "
+                    "(SELECT request_id FROM requests WHERE created_block > ?)",
+                    (block_number,)
+                )
+            conn.execute("DELETE FROM requests WHERE created_block > ?", (block_number,))
+            conn.execute(
+                "UPDATE requests SET status = 'pending', responder = NULL, response = NULL, fulfilled_block = NULL "
+                "WHERE fulfilled_block > ?",
+                (block_number,)
+            )
+            conn.execute(
+                "UPDATE meta SET value = ? WHERE key IN ('last_block', 'indexed_block') AND value > ?",
+                (block_number, block_number)
+            )
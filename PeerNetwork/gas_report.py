@@ -0,0 +1,92 @@
+import os
+import sys
+import json
+import getpass
+from web3 import Web3
+from signed_responses import result_hash
+
+# Compares per-request gas of DataTransfer and DataTransferLean on a local
+# chain. Build the artifacts first with `truffle compile` in Project/.
+BUILD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Project", "build", "contracts")
+PAYLOAD_SIZES = [64, 256, 1024, 4096, 16384]
+BATCH_SIZES = [1, 16, 64, 256]
+SAMPLE_ROW = '["sensor5", "1015 hPa", "ModelB-789", "2025-06-18 14:07:05"]'
+
+def load_artifact(name):
+    with open(os.path.join(BUILD_DIR, f"{name}.json")) as f:
+        artifact = json.load(f)
+    return artifact["abi"], artifact["bytecode"]
+
+def make_payload(size):
+    rows = []
+    while len("[" + ", ".join(rows) + "]") < size:
+        rows.append(SAMPLE_ROW)
+    return ("[" + ", ".join(rows) + "]")[:size]
+
+def transact(w3, acct, fn):
+    tx = fn.build_transaction({
+        'from': acct.address,
+        'nonce': w3.eth.get_transaction_count(acct.address),
+        'gas': 8000000,
+        'gasPrice': w3.to_wei('10', 'gwei')
+    })
+    signed = acct.sign_transaction(tx)
+    tx_hash = w3.eth.send_raw_transaction(signed.raw_transaction)
+    return w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
+
+def deploy(w3, acct, name):
+    abi, bytecode = load_artifact(name)
+    receipt = transact(w3, acct, w3.eth.contract(abi=abi, bytecode=bytecode).constructor())
+    return w3.eth.contract(address=receipt.contractAddress, abi=abi)
+
+def measure(w3, acct, contract, size):
+    payload = make_payload(size)
+    created = transact(w3, acct, contract.functions.createRequest(acct.address, payload))
+    req_id = contract.events.RequestCreated().process_receipt(created)[0].args.requestId
+    answered = transact(w3, acct, contract.functions.submitResponse(req_id, payload))
+    return created.gasUsed, answered.gasUsed
+
+def measure_batch(w3, acct, contract, count):
+    """Gas per request for commitResponseBatch over count fresh requests"""
+    first = contract.functions.nextRequestId().call()
+    for start in range(0, count, 64):
+        transact(w3, acct, contract.functions.createRequests([acct.address] * min(64, count - start), "SELECT 1"))
+    req_ids = list(range(first, first + count))
+    payload = make_payload(256)
+    committed = transact(w3, acct, contract.functions.commitResponseBatch(req_ids, [result_hash(payload)] * count))
+    return committed.gasUsed
+
+if __name__ == "__main__":
+    ganache_url = input("Enter Ganache URL [default: http://127.0.0.1:8545]: ").strip() or "http://127.0.0.1:8545"
+    private_key = getpass.getpass("Enter a funded private key: ")
+
+    w3 = Web3(Web3.HTTPProvider(ganache_url))
+    if not w3.is_connected():
+        print("\n❌ Error: Could not connect to Ganache at", ganache_url)
+        sys.exit(1)
+    acct = w3.eth.account.from_key(private_key)
+
+    full = deploy(w3, acct, "DataTransfer")
+    lean = deploy(w3, acct, "DataTransferLean")
+
+    # Requests and responses are reported apart: queries are usually short, and
+    # the lean contract still writes three fresh slots per request, so most of
+    # the saving in practice comes from responses
+    print("\n" + "="*80)
+    print(f"{'payload':>8} | {'full create':>11} {'lean create':>11} {'ratio':>6} | "
+          f"{'full respond':>12} {'lean respond':>12} {'ratio':>6}")
+    print("="*80)
+    for size in PAYLOAD_SIZES:
+        full_create, full_respond = measure(w3, acct, full, size)
+        lean_create, lean_respond = measure(w3, acct, lean, size)
+        print(f"{size:>8} | {full_create:>11} {lean_create:>11} {full_create / lean_create:>5.1f}x | "
+              f"{full_respond:>12} {lean_respond:>12} {full_respond / lean_respond:>5.1f}x")
+
+    # Merkle-batched commitments against one submitResponse per request
+    _, single = measure(w3, acct, full, 256)
+    print("\n" + "="*58)
+    print(f"{'batch':>8} | {'commit gas':>11} {'per request':>12} | {'vs submitResponse':>18}")
+    print("="*58)
+    for count in BATCH_SIZES:
+        gas = measure_batch(w3, acct, full, count)
+        print(f"{count:>8} | {gas:>11} {gas // count:>12} | {single / (gas / count):>17.1f}x")
@@ -0,0 +1,125 @@
+from web3 import Web3
+
+# ABI for Project/contracts/DataTransferLean.sol. Events and entry points match
+# DataTransfer; getRequest returns keccak256 hashes instead of the payloads.
+# Most of the gas saved is on submitResponse; see the note in the contract.
+LEAN_CONTRACT_ABI = [
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "uint256", "name": "requestId", "type": "uint256"},
+            {"indexed": True, "internalType": "address", "name": "requester", "type": "address"},
+            {"indexed": True, "internalType": "address", "name": "target", "type": "address"},
+            {"indexed": False, "internalType": "string", "name": "dbQuery", "type": "string"}
+        ],
+        "name": "RequestCreated",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "uint256", "name": "requestId", "type": "uint256"},
+            {"indexed": True, "internalType": "address", "name": "responder", "type": "address"},
+            {"indexed": False, "internalType": "string", "name": "response", "type": "string"}
+        ],
+        "name": "ResponseSent",
+        "type": "event"
+    },
+    {
+        "inputs": [
+            {"internalType": "address", "name": "_target", "type": "address"},
+            {"internalType": "string", "name": "_dbQuery", "type": "string"}
+        ],
+        "name": "createRequest",
+        "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "uint256", "name": "_requestId", "type": "uint256"}],
+        "name": "getRequest",
+        "outputs": [
+            {"internalType": "address", "name": "requester", "type": "address"},
+            {"internalType": "address", "name": "target", "type": "address"},
+            {"internalType": "bytes32", "name": "queryHash", "type": "bytes32"},
+            {"internalType": "bool", "name": "fulfilled", "type": "bool"},
+            {"internalType": "bytes32", "name": "responseHash", "type": "bytes32"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "uint256[]", "name": "_requestIds", "type": "uint256[]"}],
+        "name": "getRequestStatuses",
+        "outputs": [
+            {"internalType": "address[]", "name": "requesters", "type": "address[]"},
+            {"internalType": "address[]", "name": "targets", "type": "address[]"},
+            {"internalType": "bool[]", "name": "fulfilled", "type": "bool[]"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "uint256", "name": "_fromId", "type": "uint256"},
+            {"internalType": "uint256", "name": "_count", "type": "uint256"}
+        ],
+        "name": "getRequestStatusRange",
+        "outputs": [
+            {"internalType": "address[]", "name": "requesters", "type": "address[]"},
+            {"internalType": "address[]", "name": "targets", "type": "address[]"},
+            {"internalType": "bool[]", "name": "fulfilled", "type": "bool[]"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "nextRequestId",
+        "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "name": "requests",
+        "outputs": [
+            {"internalType": "address", "name": "requester", "type": "address"},
+            {"internalType": "bool", "name": "fulfilled", "type": "bool"},
+            {"internalType": "address", "name": "target", "type": "address"},
+            {"internalType": "bytes32", "name": "queryHash", "type": "bytes32"},
+            {"internalType": "bytes32", "name": "responseHash", "type": "bytes32"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "uint256", "name": "_requestId", "type": "uint256"},
+            {"internalType": "string", "name": "_response", "type": "string"}
+        ],
+        "name": "submitResponse",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    }
+]
+
+def _payload_from_logs(event, req_id, expected_hash):
+    """Find the logged payload whose keccak256 matches the on-chain commitment"""
+    for log in event().get_logs(from_block=0, argument_filters={'requestId': req_id}):
+        payload = log.args.get("dbQuery", log.args.get("response"))
+        if Web3.keccak(text=payload) == expected_hash:
+            return payload
+    return None
+
+def get_lean_request(contract, req_id):
+    """Return (requester, target, dbQuery, fulfilled, response) like DataTransfer.getRequest"""
+    requester, target, query_hash, fulfilled, response_hash = contract.functions.getRequest(req_id).call()
+    query = _payload_from_logs(contract.events.RequestCreated, req_id, query_hash)
+    response = ""
+    if fulfilled:
+        response = _payload_from_logs(contract.events.ResponseSent, req_id, response_hash)
+        if response is None:
+            response = "Error: response log missing or does not match its on-chain hash"
+    return (requester, target, query if query is not None else "<query log unavailable>", fulfilled, response)
@@ -7,6 +7,7 @@ import threading
 import getpass
 from web3 import Web3
 from web3.middleware.proof_of_authority import ExtraDataToPOAMiddleware
+from responder_election import ResponderElection
 
 # Embedded ABI for DataTransfer.sol
 CONTRACT_ABI = [
@@ -96,6 +97,7 @@ ganache_url = get_input("Enter Ganache URL [default: http://127.0.0.1:8545]: ")
 contract_address = get_input("Enter contract address: ")
 private_key = get_input("Enter your private key: ", password=True)
 db_path = get_input("Enter database path (e.g., peer1.db): ")
+peer_list = get_input("Enter all peer addresses for responder election (comma-separated, blank to always respond): ")
 
 # Web3 Setup
 w3 = Web3(Web3.HTTPProvider(ganache_url))
@@ -115,6 +117,7 @@ try:
     print("\n✅ Connection successful! Account:", acct.address)
     print("   Contract address:", contract_address)
     print("   Database path:", db_path)
+    election = ResponderElection(acct.address, [p.strip() for p in peer_list.split(",") if p.strip()])
 except Exception as e:
     print(f"\n❌ Error: {str(e)}")
     sys.exit(1)
@@ -132,6 +135,15 @@ def handle_query(db_path, query):
     except Exception as e:
         return f"Error: {str(e)}"
 
+def answer_request(req_id, db_query):
+    # Pre-flight: skip work another peer has already finished
+    if contract.functions.requests(req_id).call()[2]:
+        election.note_fulfilled(req_id)
+        print(f"↩️ Request {req_id} already fulfilled, skipping")
+        return
+    response = handle_query(db_path, db_query)
+    send_response(req_id, response)
+
 def listen_for_requests():
     """Listen for new blockchain requests"""
     print("\n🔊 Listening for new requests...")
@@ -147,14 +159,20 @@ def listen_for_requests():
                     for tx in block.transactions:
                         if tx.to and tx.to.lower() == contract.address.lower():
                             receipt = w3.eth.get_transaction_receipt(tx.hash)
+                            for event in contract.events.ResponseSent().process_receipt(receipt):
+                                election.note_fulfilled(event.args.requestId)
                             logs = contract.events.RequestCreated().process_receipt(receipt)
                             for event in logs:
                                 req_id = event.args.requestId
                                 db_query = event.args.dbQuery
                                 print(f"\n📩 New request {req_id}: {db_query}")
-                                response = handle_query(db_path, db_query)
-                                send_response(req_id, response)
+                                if election.offer(req_id, db_query):
+                                    answer_request(req_id, db_query)
                 last_block = current_block
+            # Elected peer stayed silent: backups answer in rank order
+            for req_id, db_query in election.due():
+                print(f"\n⏰ Backup answering request {req_id}")
+                answer_request(req_id, db_query)
             time.sleep(2)
         except Exception as e:
             print(f"⚠️ Event listening error: {str(e)}")
@@ -0,0 +1,179 @@
+import re
+import json
+import time
+import base64
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from direct_transport import direct_query
+from query_protocol import encode_request
+
+# Peers advertise what they hold (tables, key digests, schema hash, load) as a
+# "capabilities" document served over the direct transport. The transport
+# signs every result, so an advert is attributable to the peer that served it.
+# Endpoints themselves come from DataTransfer's EndpointSet events.
+INTERNAL_TABLES = {"delta_watermarks", "delta_changes", "data_versions"}
+FROM_TABLE = re.compile(r'\bFROM\s+"?(\w+)', re.IGNORECASE)
+# Table counts take a scan, so an advert's contents are reused for a few seconds
+ADVERT_TTL = 5
+_described = {}
+_described_lock = threading.Lock()
+# Tables with a key column advertise a Bloom filter of their keys, so lookups
+# and polls go to a peer that (very likely) has the keys rather than any peer
+# with the table. Building one hashes every key, so it is kept for longer.
+KEY_DIGEST_TTL = 60
+KEY_BLOOM_HASHES = 7
+MAX_KEY_BLOOM_BITS = 1 << 18
+_key_digests = {}
+
+def _bloom_positions(key, bits):
+    digest = hashlib.sha256(str(key).encode()).digest()
+    return [int.from_bytes(digest[4 * i:4 * i + 4], "big") % bits for i in range(KEY_BLOOM_HASHES)]
+
+def key_bloom(keys, count):
+    """Base64 Bloom filter of keys, about 10 bits per key up to MAX_KEY_BLOOM_BITS"""
+    bits = min(MAX_KEY_BLOOM_BITS, (max(1024, count * 10) + 7) // 8 * 8)
+    data = bytearray(bits // 8)
+    for key in keys:
+        for position in _bloom_positions(key, bits):
+            data[position >> 3] |= 1 << (position & 7)
+    return base64.b64encode(bytes(data)).decode()
+
+def bloom_may_contain(data, key):
+    """False only if key is certainly not in the filter (raw bytes of a key_bloom)"""
+    return all(data[position >> 3] & 1 << (position & 7) for position in _bloom_positions(key, len(data) * 8))
+
+def describe_store(store, peer, load):
+    """Capability advert for this peer's sensor database"""
+    now = time.time()
+    with _described_lock:
+        cached = _described.get(store.db_path)
+        if cached is None or now - cached[0] > ADVERT_TTL:
+            cached = _described[store.db_path] = (now,) + _describe_tables(store)
+    _, tables, schema_hash = cached
+    return {
+        "peer": peer,
+        "tables": tables,
+        "schema_hash": schema_hash,
+        "load": round(load, 3),
+        "issued_at": int(now)
+    }
+
+def _describe_tables(store):
+    conn = store.connection()
+    schema = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    ).fetchall()
+    tables = {}
+    for name, _ in schema:
+        if name in INTERNAL_TABLES:
+            continue
+        tables[name] = {"rows": conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0]}
+        if "key" in (row[1] for row in conn.execute(f'PRAGMA table_info("{name}")')):
+            tables[name]["key_bloom"] = _key_digest(store, conn, name, tables[name]["rows"])
+    digest = hashlib.sha256("\n".join(sql for name, sql in schema if name not in INTERNAL_TABLES).encode())
+    return tables, digest.hexdigest()
+
+def _key_digest(store, conn, table, count):
+    cached = _key_digests.get((store.db_path, table))
+    if cached is None or time.time() - cached[0] > KEY_DIGEST_TTL:
+        keys = (row[0] for row in conn.execute(f'SELECT "key" FROM "{table}"'))
+        cached = _key_digests[(store.db_path, table)] = (time.time(), key_bloom(keys, count))
+    return cached[1]
+
+def query_table(db_query):
+    """Table a query reads from, for routing; None if it can't be told"""
+    try:
+        request = json.loads(db_query)
+        if isinstance(request, dict) and "op" in request:
+            return request.get("table", "data")
+    except ValueError:
+        pass
+    match = FROM_TABLE.search(db_query)
+    return match.group(1) if match else None
+
+class PeerRegistry:
+    """Requester-side cache of peer adverts with TTL, and routing on top of it"""
+
+    def __init__(self, contract, private_key, ttl=60, workers=8):
+        self.contract = contract
+        self.private_key = private_key
+        self.ttl = ttl
+        self.workers = workers
+        self.adverts = {}
+        self.fetched_at = {}
+        self.endpoints = {}
+        self.endpoint_block = 0
+        self.discovered_at = 0
+        self.lock = threading.Lock()
+        # Held for a whole scan so concurrent callers never fetch the same blocks twice
+        self.discover_lock = threading.Lock()
+
+    def discover(self):
+        """Pick up endpoints advertised on chain since the last call"""
+        with self.discover_lock:
+            head = self.contract.w3.eth.block_number
+            if head >= self.endpoint_block:
+                for event in self.contract.events.EndpointSet().get_logs(from_block=self.endpoint_block, to_block=head):
+                    if event.args.endpoint:
+                        self.endpoints[event.args.peer] = event.args.endpoint
+                    else:
+                        self.endpoints.pop(event.args.peer, None)
+                # Only blocks after head are scanned next time
+                self.endpoint_block = head + 1
+            self.discovered_at = time.time()
+            return self.endpoints
+
+    def endpoint(self, peer):
+        """peer's advertised endpoint, looking on chain at most once per TTL"""
+        if peer not in self.endpoints and time.time() - self.discovered_at > self.ttl:
+            self.discover()
+        return self.endpoints.get(peer)
+
+    def _fetch(self, peer, endpoint):
+        try:
+            result, _ = direct_query(
+                endpoint, self.private_key, self.contract.address,
+                encode_request("capabilities"), responder=peer, timeout=5
+            )
+            advert = json.loads(result)
+        except Exception as e:
+            print(f"⚠️ No advert from {peer} at {endpoint}: {str(e)}")
+            advert = None
+        with self.lock:
+            # A failed fetch is cached too, so a dead peer isn't retried on every route
+            self.adverts[peer] = advert
+            self.fetched_at[peer] = time.time()
+
+    def refresh(self, force=False):
+        """Fetch adverts that are missing or older than the TTL, in parallel"""
+        now = time.time()
+        stale = [
+            (peer, endpoint) for peer, endpoint in self.discover().items()
+            if force or now - self.fetched_at.get(peer, 0) > self.ttl
+        ]
+        if stale:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                list(executor.map(lambda item: self._fetch(*item), stale))
+        with self.lock:
+            return {peer: advert for peer, advert in self.adverts.items() if advert}
+
+    def route(self, table, exclude=(), keys=()):
+        """Peers that hold rows of table, least loaded first
+
+        With keys, peers whose key filter rules out every one of them are
+        skipped, and those likely to hold more of the keys come first.
+        """
+        candidates = []
+        for peer, advert in self.refresh().items():
+            info = advert["tables"].get(table)
+            if peer in exclude or not info or not info["rows"]:
+                continue
+            matches = 0
+            if keys and info.get("key_bloom"):
+                bloom = base64.b64decode(info["key_bloom"])
+                matches = sum(1 for key in keys if bloom_may_contain(bloom, key))
+                if not matches:
+                    continue
+            candidates.append((-matches, advert["load"], peer))
+        return [peer for _, _, peer in sorted(candidates)]
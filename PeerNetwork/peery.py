@@ -7,7 +7,10 @@ import threading
 import getpass
 from web3 import Web3
 from web3.middleware.proof_of_authority import ExtraDataToPOAMiddleware
-from eth_utils import event_abi_to_log_topic, abi
+from responder_election import ResponderElection
+from event_decoder import (
+    UNTARGETED_REQUEST_CREATED_TOPIC, RESPONSE_SENT_TOPIC, decode_untargeted_request_created, decode_response_sent
+)
 
 # Directly embedded ABI from your contract
 CONTRACT_ABI = [
@@ -95,6 +98,7 @@ ganache_url = get_input("Enter Ganache URL [default: http://127.0.0.1:8545]: ")
 contract_address = get_input("Enter contract address: ")
 private_key = get_input("Enter your private key: ", password=True)
 db_path = get_input("Enter database path (e.g., peer1.db): ")
+peer_list = get_input("Enter all peer addresses for responder election (comma-separated, blank to always respond): ")
 
 # Web3 Setup
 w3 = Web3(Web3.HTTPProvider(ganache_url))
@@ -113,6 +117,7 @@ try:
     print("\n✅ Connection successful! Account:", acct.address)
     print("   Contract address:", contract_address)
     print("   Database path:", db_path)
+    election = ResponderElection(acct.address, [p.strip() for p in peer_list.split(",") if p.strip()])
     print("   Account balance:", w3.from_wei(w3.eth.get_balance(acct.address), 'ether'), "ETH")
 except Exception as e:
     print(f"\n❌ Error: {str(e)}")
@@ -130,10 +135,17 @@ def handle_query(db_path, query):
     except Exception as e:
         return f"Error: {str(e)}"
 
+def answer_request(req_id, db_query):
+    # Pre-flight: skip work another peer has already finished
+    if contract.functions.requests(req_id).call()[2]:
+        election.note_fulfilled(req_id)
+        print(f"↩️ Request {req_id} already fulfilled, skipping")
+        return
+    response = handle_query(db_path, db_query)
+    send_response(req_id, response)
+
 def listen_for_requests():
     print("\n🔊 Listening for new requests...")
-    event_abi = contract.events.RequestCreated._get_event_abi()
-    request_created_topic = event_abi_to_log_topic(event_abi)
     last_block = w3.eth.block_number
     
     while True:
@@ -146,17 +158,24 @@ def listen_for_requests():
                         if tx.to and tx.to.lower() == contract.address.lower():
                             receipt = w3.eth.get_transaction_receipt(tx.hash)
                             for log in receipt['logs']:
-                                if log['topics'] and log['topics'][0] == request_created_topic:
-                                    try:
-                                        event_data = contract.events.RequestCreated().process_log(log)
-                                        req_id = event_data.args.requestId
-                                        db_query = event_data.args.dbQuery
+                                try:
+                                    if log['topics'] and log['topics'][0] == RESPONSE_SENT_TOPIC:
+                                        election.note_fulfilled(decode_response_sent(log).request_id)
+                                    if log['topics'] and log['topics'][0] == UNTARGETED_REQUEST_CREATED_TOPIC:
+                                        event = decode_untargeted_request_created(log)
+                                        req_id = event.request_id
+                                        db_query = event.db_query
                                         print(f"\n📩 New request {req_id}: {db_query}")
-                                        response = handle_query(db_path, db_query)
-                                        send_response(req_id, response)
-                                    except Exception as e:
-                                        print(f"⚠️ Event processing error: {str(e)}")
+                                        if election.offer(req_id, db_query):
+                                            answer_request(req_id, db_query)
+                                except Exception as e:
+                                    # One bad log must not abort the rest of the block
+                                    print(f"⚠️ Event processing error: {str(e)}")
                 last_block = current_block
+            # Elected peer stayed silent: backups answer in rank order
+            for req_id, db_query in election.due():
+                print(f"\n⏰ Backup answering request {req_id}")
+                answer_request(req_id, db_query)
             time.sleep(2)
         except Exception as e:
             print(f"⚠️ Event listening error: {str(e)}")
@@ -1,13 +1,38 @@
 import os
 import sys
 import json
-import sqlite3
 import time
 import threading
 import getpass
+from concurrent.futures import ThreadPoolExecutor
 from web3 import Web3
 from web3.middleware.proof_of_authority import ExtraDataToPOAMiddleware
+from web3.exceptions import TransactionNotFound
 from eth_utils import event_abi_to_log_topic
+from query_protocol import encode_request, decode_request
+from batch_lookup import LookupBatcher
+from sensor_store import open_store
+from delta_query import DeltaTracker, delta_scope
+from subscriptions import SubscriptionManager
+from scatter_gather import scatter_gather
+from lean_contract import LEAN_CONTRACT_ABI, get_lean_request
+from event_index import EventIndex
+from chain_follower import ChainFollower
+from tx_manager import TxManager
+from account_pool import AccountPool
+from scheduler import RequestScheduler, estimate_cost, priority_class
+from admission import AdmissionController, BUSY, DEFER, DROP
+from rpc_pool import ProviderPool
+from event_decoder import decode_request_created, decode_response_sent
+from request_state import RequestHistory, unpack_address
+from backfill import backfill
+from bulk_status import request_statuses
+from compression import DICTIONARIES, compress_response, decompress_response, load_dictionaries
+from direct_transport import DirectServer, direct_query, parse_endpoint
+from peer_registry import PeerRegistry, describe_store, query_table
+from replica_cache import ReplicaCache, data_version, sign_response, verify_response
+import signed_responses
+from signing_pipeline import CallTemplate, SigningPipeline
 
 CONTRACT_ABI = [
     {
@@ -41,6 +66,16 @@ CONTRACT_ABI = [
         "stateMutability": "nonpayable",
         "type": "function"
     },
+    {
+        "inputs": [
+            {"internalType": "address[]", "name": "_targets", "type": "address[]"},
+            {"internalType": "string", "name": "_dbQuery", "type": "string"}
+        ],
+        "name": "createRequests",
+        "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
     {
         "inputs": [{"internalType": "uint256", "name": "_requestId", "type": "uint256"}],
         "name": "getRequest",
@@ -54,6 +89,31 @@ CONTRACT_ABI = [
         "stateMutability": "view",
         "type": "function"
     },
+    {
+        "inputs": [{"internalType": "uint256[]", "name": "_requestIds", "type": "uint256[]"}],
+        "name": "getRequestStatuses",
+        "outputs": [
+            {"internalType": "address[]", "name": "requesters", "type": "address[]"},
+            {"internalType": "address[]", "name": "targets", "type": "address[]"},
+            {"internalType": "bool[]", "name": "fulfilled", "type": "bool[]"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "uint256", "name": "_fromId", "type": "uint256"},
+            {"internalType": "uint256", "name": "_count", "type": "uint256"}
+        ],
+        "name": "getRequestStatusRange",
+        "outputs": [
+            {"internalType": "address[]", "name": "requesters", "type": "address[]"},
+            {"internalType": "address[]", "name": "targets", "type": "address[]"},
+            {"internalType": "bool[]", "name": "fulfilled", "type": "bool[]"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
     {
         "inputs": [],
         "name": "nextRequestId",
@@ -74,6 +134,196 @@ CONTRACT_ABI = [
         "stateMutability": "view",
         "type": "function"
     },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "address", "name": "owner", "type": "address"},
+            {"indexed": True, "internalType": "address", "name": "responder", "type": "address"}
+        ],
+        "name": "ResponderAuthorized",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "address", "name": "owner", "type": "address"},
+            {"indexed": True, "internalType": "address", "name": "responder", "type": "address"}
+        ],
+        "name": "ResponderRevoked",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "uint256", "name": "subscriptionId", "type": "uint256"},
+            {"indexed": True, "internalType": "address", "name": "requester", "type": "address"},
+            {"indexed": True, "internalType": "address", "name": "target", "type": "address"},
+            {"indexed": False, "internalType": "string", "name": "dbQuery", "type": "string"},
+            {"indexed": False, "internalType": "uint256", "name": "interval", "type": "uint256"}
+        ],
+        "name": "SubscriptionCreated",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "uint256", "name": "subscriptionId", "type": "uint256"}
+        ],
+        "name": "SubscriptionCancelled",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "uint256", "name": "subscriptionId", "type": "uint256"},
+            {"indexed": True, "internalType": "address", "name": "responder", "type": "address"},
+            {"indexed": False, "internalType": "string", "name": "response", "type": "string"}
+        ],
+        "name": "SubscriptionDelivered",
+        "type": "event"
+    },
+    {
+        "inputs": [
+            {"internalType": "address", "name": "_target", "type": "address"},
+            {"internalType": "string", "name": "_dbQuery", "type": "string"},
+            {"internalType": "uint256", "name": "_interval", "type": "uint256"}
+        ],
+        "name": "createSubscription",
+        "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "uint256", "name": "_subscriptionId", "type": "uint256"}],
+        "name": "cancelSubscription",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "uint256[]", "name": "_subscriptionIds", "type": "uint256[]"},
+            {"internalType": "string[]", "name": "_responses", "type": "string[]"}
+        ],
+        "name": "deliverSubscriptions",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "address", "name": "peer", "type": "address"},
+            {"indexed": False, "internalType": "string", "name": "endpoint", "type": "string"}
+        ],
+        "name": "EndpointSet",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "uint256", "name": "transferId", "type": "uint256"},
+            {"indexed": True, "internalType": "address", "name": "requester", "type": "address"},
+            {"indexed": True, "internalType": "address", "name": "responder", "type": "address"},
+            {"indexed": False, "internalType": "bytes32", "name": "queryHash", "type": "bytes32"},
+            {"indexed": False, "internalType": "bytes32", "name": "resultHash", "type": "bytes32"},
+            {"indexed": False, "internalType": "uint256", "name": "size", "type": "uint256"},
+            {"indexed": False, "internalType": "bytes32", "name": "nonce", "type": "bytes32"}
+        ],
+        "name": "TransferCommitted",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "bytes32", "name": "root", "type": "bytes32"},
+            {"indexed": True, "internalType": "address", "name": "responder", "type": "address"},
+            {"indexed": False, "internalType": "uint256[]", "name": "requestIds", "type": "uint256[]"}
+        ],
+        "name": "ResponsesCommitted",
+        "type": "event"
+    },
+    {
+        "inputs": [
+            {"internalType": "uint256[]", "name": "_requestIds", "type": "uint256[]"},
+            {"internalType": "bytes32[]", "name": "_responseHashes", "type": "bytes32[]"}
+        ],
+        "name": "commitResponseBatch",
+        "outputs": [{"internalType": "bytes32", "name": "", "type": "bytes32"}],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "bytes32", "name": "", "type": "bytes32"}],
+        "name": "batchResponder",
+        "outputs": [{"internalType": "address", "name": "", "type": "address"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "bytes32", "name": "_root", "type": "bytes32"},
+            {"internalType": "uint256", "name": "_requestId", "type": "uint256"},
+            {"internalType": "bytes32", "name": "_responseHash", "type": "bytes32"},
+            {"internalType": "bytes32[]", "name": "_proof", "type": "bytes32[]"}
+        ],
+        "name": "verifyBatchedResponse",
+        "outputs": [{"internalType": "bool", "name": "", "type": "bool"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "address", "name": "", "type": "address"}],
+        "name": "endpoints",
+        "outputs": [{"internalType": "string", "name": "", "type": "string"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "string", "name": "_endpoint", "type": "string"}],
+        "name": "setEndpoint",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "address", "name": "_responder", "type": "address"},
+            {"internalType": "bytes32", "name": "_queryHash", "type": "bytes32"},
+            {"internalType": "bytes32", "name": "_resultHash", "type": "bytes32"},
+            {"internalType": "uint256", "name": "_size", "type": "uint256"},
+            {"internalType": "bytes32", "name": "_nonce", "type": "bytes32"},
+            {"internalType": "bytes", "name": "_signature", "type": "bytes"}
+        ],
+        "name": "commitTransfer",
+        "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "address", "name": "", "type": "address"}],
+        "name": "responderOwner",
+        "outputs": [{"internalType": "address", "name": "", "type": "address"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "address", "name": "_responder", "type": "address"},
+            {"internalType": "bytes", "name": "_signature", "type": "bytes"}
+        ],
+        "name": "authorizeResponder",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "address", "name": "_responder", "type": "address"}],
+        "name": "revokeResponder",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
     {
         "inputs": [
             {"internalType": "uint256", "name": "_requestId", "type": "uint256"},
@@ -96,13 +346,44 @@ print("\n" + "="*50)
 print("PEER NODE SETUP")
 print("="*50)
 
-ganache_url = get_input("Enter Ganache URL [default: http://127.0.0.1:8545]: ") or "http://127.0.0.1:8545"
+ganache_url = get_input("Enter Ganache URL(s), comma-separated [default: http://127.0.0.1:8545]: ") or "http://127.0.0.1:8545"
 contract_address = get_input("Enter contract address: ")
+contract_variant = get_input("Contract variant (full/lean) [default: full]: ").lower() or "full"
 private_key = get_input("Enter your private key: ", password=True)
 db_path = get_input("Enter database path (e.g., peer1.db): ")
+confirmations = int(get_input("Confirmation depth in blocks [default: 0]: ") or "0")
+hot_wallets = int(get_input("Hot responder wallets [default: 0]: ") or "0")
+rate_limit = float(get_input("Per-requester rate limit in requests/sec [default: 1]: ") or "1")
+direct_endpoint = get_input("Direct transport address to advertise, host:port [default: off]: ")
+while direct_endpoint:
+    try:
+        parse_endpoint(direct_endpoint)
+        break
+    except ValueError as e:
+        print(f"   ❌ {str(e)}")
+        direct_endpoint = get_input("Direct transport address to advertise, host:port [default: off]: ")
+offchain_responses = get_input("Deliver responses off chain as signed messages? (y/N): ").lower() == "y"
+replica_cache_mb = get_input("Replica cache for other peers' signed responses, in MB [default: off]: ")
+response_compression = get_input("Response compression dictionary, 0 for plain deflate [default: off]: ")
+
+if offchain_responses and not direct_endpoint:
+    print("   ⚠️ Off-chain responses need the direct transport; answering on chain")
+    offchain_responses = False
+
+# Shared dictionaries trained with `python compression.py train`
+load_dictionaries(os.path.dirname(os.path.abspath(__file__)))
+response_dictionary = int(response_compression) if response_compression else None
+if response_dictionary and response_dictionary not in DICTIONARIES:
+    print(f"\n❌ Error: Unknown compression dictionary {response_dictionary}")
+    sys.exit(1)
 
 # Web3 Setup
-w3 = Web3(Web3.HTTPProvider(ganache_url))
+rpc_urls = [url.strip() for url in ganache_url.split(",") if url.strip()]
+if len(rpc_urls) > 1:
+    # Reads go to the fastest healthy endpoint, writes stay pinned to one
+    w3 = Web3(ProviderPool(rpc_urls))
+else:
+    w3 = Web3(Web3.HTTPProvider(ganache_url))
 if not w3.is_connected():
     print("\n❌ Error: Could not connect to Ganache at", ganache_url)
     sys.exit(1)
@@ -113,10 +394,34 @@ try:
     acct = w3.eth.account.from_key(private_key)
     contract = w3.eth.contract(
         address=Web3.to_checksum_address(contract_address),
-        abi=CONTRACT_ABI
+        abi=LEAN_CONTRACT_ABI if contract_variant == "lean" else CONTRACT_ABI
     )
+    tx_manager = TxManager(w3, acct, w3.to_wei('10', 'gwei'))
+    response_template = CallTemplate(
+        contract.address,
+        "submitResponse(uint256,string)",
+        ["uint256", "string"],
+        w3.eth.chain_id,
+        tx_manager.gas_price
+    )
+    responder_pool = None
+    if hot_wallets and contract_variant == "lean":
+        print("   ⚠️ Hot responder wallets need the full contract; answering from the main account")
+    elif hot_wallets:
+        responder_pool = AccountPool(
+            w3, contract, tx_manager,
+            os.path.splitext(db_path)[0] + "_hot_wallets.json",
+            hot_wallets
+        )
+        responder_pool.prepare(w3.to_wei(0.2, 'ether'), w3.to_wei(1, 'ether'))
+        print("   Hot responder wallets:", len(responder_pool.managers))
+    signer = SigningPipeline(
+        [private_key] + (responder_pool.keys if responder_pool else []),
+        workers=min(4, os.cpu_count() or 1)
+    )
+    confirmer = ThreadPoolExecutor(max_workers=8)
     print("\n✅ Connection successful! Account:", acct.address)
-    print("   Contract address:", contract_address)
+    print("   Contract address:", contract_address, f"({contract_variant})")
     print("   Database path:", db_path)
     print("   Account balance:", w3.from_wei(w3.eth.get_balance(acct.address), 'ether'), "ETH")
 except Exception as e:
@@ -126,80 +431,695 @@ except Exception as e:
 # --- Helper Functions ---
 def handle_query(db_path, query):
     try:
-        conn = sqlite3.connect(db_path)
-        cur = conn.cursor()
-        cur.execute(query)
-        result = cur.fetchall()
-        conn.close()
+        result = open_store(db_path).execute(query)
         return json.dumps(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
+def handle_latest(db_path, request):
+    try:
+        result = open_store(db_path).latest(
+            request.get("limit", 10),
+            request.get("since"),
+            request.get("model_number")
+        )
+        return json.dumps(result)
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+# --- Request Processing State ---
+store = open_store(db_path)
+batcher = LookupBatcher()
+scheduler = RequestScheduler(rate=rate_limit, burst=max(10, rate_limit * 10))
+admission = AdmissionController()
+deltas = DeltaTracker(store)
+subscriptions = SubscriptionManager(store, deltas)
+event_index = EventIndex(os.path.splitext(db_path)[0] + "_events.db")
+# Adverts from peers with a direct endpoint, for routing requests automatically
+registry = PeerRegistry(contract, private_key) if contract_variant != "lean" else None
+# Signed responses from other peers, re-served to requesters that accept some staleness
+replicas = ReplicaCache(int(replica_cache_mb) * 1024 * 1024) if replica_cache_mb else None
+# Events land here first and reach the index once per poll, before the block watermark moves
+history = RequestHistory(event_index)
+
+def pending_transactions():
+    managers = [tx_manager] + (responder_pool.managers if responder_pool else [])
+    return sum(manager.in_flight() for manager in managers) + signer.outbox.qsize()
+
+def handle_request_created(log):
+    # Every request is indexed, whoever it targets and however busy we are
+    event = decode_request_created(log)
+    req_id = event.request_id
+    requester = event.requester
+    target = event.target
+    db_query = event.db_query
+    history.record_request(req_id, requester, target, db_query, event.block_number)
+    
+    # Only respond if we're the target
+    if target.lower() != acct.address.lower():
+        print(f"⚠️ Request {req_id} not for this peer (target: {target})")
+        return
+    
+    if event_index.is_answered(req_id):
+        print(f"↩️ Request {req_id} already answered, skipping")
+        return
+    
+    print(f"\n📩 New request {req_id} (TARGETED): {db_query}")
+    cost = estimate_cost(db_query)
+    decision = admission.decide(len(scheduler), pending_transactions(), priority_class(cost))
+    if decision == BUSY and admission.may_reply_busy(requester, pending_transactions()):
+        print(f"🛑 Peer saturated, telling requester of {req_id} to retry in {admission.retry_after}s")
+        send_response(req_id, admission.busy_response())
+    elif decision in (BUSY, DROP):
+        print(f"🛑 Peer saturated, request {req_id} dropped unanswered")
+    elif decision == DEFER:
+        print(f"⏸️ Request {req_id} deferred until load drops")
+        admission.defer((req_id, requester, db_query))
+    else:
+        schedule_request(req_id, requester, db_query)
+
+def schedule_request(req_id, requester, db_query):
+    if not scheduler.submit(requester, (req_id, requester, db_query), estimate_cost(db_query)):
+        print(f"🚦 Request {req_id} dropped: too many queued requests from {requester}")
+        # One busy answer per window tells the requester to back off; the rest go unanswered
+        if admission.may_reply_busy(requester, pending_transactions()):
+            send_response(req_id, admission.busy_response())
+
+def execute_request(req_id, requester, db_query):
+    request = decode_request(db_query)
+    if request and request["op"] == "lookup":
+        batcher.add(req_id, request.get("table", "data"), request.get("keys", []))
+    elif request and request["op"] == "latest":
+        send_response(req_id, handle_latest(db_path, request))
+    elif request and request["op"] == "delta":
+        # The watermark only moves once the response is delivered; a lost one is resent next time
+        response = deltas.answer(requester, request, advance=False)
+        send_response(req_id, response, on_delivered=delta_delivered(requester, request, response))
+    else:
+        response = handle_query(db_path, db_query)
+        send_response(req_id, response)
+
+def delta_delivered(requester, request, response):
+    """Callback moving requester's delta watermark to the one response carries"""
+    try:
+        watermark = json.loads(response)["watermark"]
+    except (ValueError, TypeError, KeyError):
+        return None
+    return lambda: deltas.set_watermark(requester, delta_scope(request), watermark)
+
+def handle_direct(requester, query):
+    """Entry point for the direct transport: the on-chain per-requester rate limit applies here too"""
+    if not scheduler.allow(requester):
+        print(f"🚦 Direct query from {requester} dropped: rate limit")
+        return admission.busy_response()
+    return answer_direct(requester, query)
+
+def answer_direct(requester, query):
+    """Answer a query that arrived over the direct transport, bypassing the chain"""
+    request = decode_request(query)
+    load = admission.load(len(scheduler), pending_transactions())
+    # Adverts are what tell requesters we're busy, so they are always served
+    if request and request["op"] == "capabilities":
+        advert = describe_store(store, acct.address, load)
+        advert["replica"] = replicas is not None
+        return json.dumps(advert)
+    if request and request["op"] == "responses":
+        return collect_signed_responses(requester, request.get("ids", []))
+    if request and request["op"] == "cached" and str(request.get("origin")).lower() != acct.address.lower():
+        return serve_cached(request, load)
+    if load >= 1.0:
+        return admission.busy_response()
+    if request and request["op"] in ("signed", "cached"):
+        inner = request["query"]
+        if (decode_request(inner) or {}).get("op") == "delta":
+            return "Error: delta queries are per requester and can't be signed for sharing"
+        # Read first, so the signed version never claims data newer than the result
+        version = data_version(store, query_table(inner) or "data")
+        result = answer_direct(requester, inner)
+        # Only real answers get signed for re-serving; errors and busy replies go back as they are
+        try:
+            parsed = json.loads(result)
+        except ValueError:
+            return result
+        if isinstance(parsed, dict) and ("busy" in parsed or "error" in parsed):
+            return result
+        return json.dumps(sign_response(private_key, acct.address, contract.address, inner, result, version))
+    print(f"\n⚡ Direct query from {requester}: {query}")
+    if request and request["op"] == "lookup":
+        lookup = LookupBatcher()
+        lookup.add(0, request.get("table", "data"), request.get("keys", []))
+        return lookup.flush(db_path)[0]
+    elif request and request["op"] == "latest":
+        return handle_latest(db_path, request)
+    elif request and request["op"] == "delta":
+        return deltas.answer(requester, request)
+    return handle_query(db_path, query)
+
+def request_requester(req_id):
+    record = history.get(req_id)
+    if record and record.requester:
+        return unpack_address(record.requester)
+    row = event_index.get(req_id)
+    return row["requester"] if row else None
+
+def collect_signed_responses(requester, req_ids):
+    """Signed responses for req_ids, limited to requests this requester made"""
+    req_ids = [req_id for req_id in req_ids[:500] if (request_requester(req_id) or "").lower() == requester.lower()]
+    if not req_ids:
+        return "[]"
+    return json.dumps([list(row) for row in event_index.signed_responses(req_ids)])
+
+def fetch_signed_responses():
+    if registry is None:
+        print("\n⚠️ Off-chain responses need the endpoint registry of the full contract")
+        return
+    try:
+        outstanding = event_index.by_requester(acct.address, "pending", limit=10000)
+        by_target = {}
+        for row in outstanding:
+            by_target.setdefault(Web3.to_checksum_address(row["target"]), []).append(row["request_id"])
+        endpoints = registry.discover()
+        collected = []
+        for target, req_ids in by_target.items():
+            if target not in endpoints:
+                continue
+            try:
+                result, _ = direct_query(
+                    endpoints[target], private_key, contract.address,
+                    encode_request("responses", ids=req_ids), responder=target
+                )
+                collected += [(target, *row) for row in json.loads(result)]
+            except Exception as e:
+                print(f"⚠️ Could not collect from {target}: {str(e)}")
+        # One pass over every signature, spread over the signing workers
+        signers = signed_responses.verify_responses(
+            contract.address,
+            [(req_id, response, signature) for _, req_id, response, signature, _, _ in collected],
+            executor=signer.executor
+        )
+        accepted = committed = 0
+        batch_owners = {}
+        for (target, req_id, response, _, root, proof), signed_by in zip(collected, signers):
+            if signed_by is None or signed_by.lower() != target.lower():
+                print(f"   ❌ Request {req_id}: signature does not match {target}")
+                continue
+            history.record_response(req_id, target, response, None)
+            accepted += 1
+            if root is None:
+                continue
+            leaf = signed_responses.merkle_leaf(req_id, signed_responses.result_hash(response))
+            if not signed_responses.verify_proof(leaf, [bytes.fromhex(node[2:]) for node in json.loads(proof)], bytes.fromhex(root[2:])):
+                print(f"   ❌ Request {req_id}: inclusion proof does not match root {root[:18]}…")
+                continue
+            # One view call per batch root, however many of our requests it covers
+            if root not in batch_owners:
+                batch_owners[root] = contract.functions.batchResponder(bytes.fromhex(root[2:])).call()
+            if batch_owners[root].lower() == target.lower():
+                committed += 1
+        history.flush()
+        print(f"\n✍️ Collected {accepted} verified response(s) for {len(outstanding)} outstanding request(s), "
+              f"{committed} committed on chain in {len(batch_owners)} batch(es)")
+    except Exception as e:
+        print(f"❌ Collecting responses failed: {str(e)}")
+
+def fetch_signed(endpoint, origin, query):
+    """Signed envelope for query straight from its origin, checked before use"""
+    result, _ = direct_query(
+        endpoint, private_key, contract.address, encode_request("signed", query=query), responder=origin
+    )
+    try:
+        envelope = json.loads(result)
+    except ValueError:
+        envelope = None
+    if not isinstance(envelope, dict) or "signature" not in envelope:
+        raise ValueError(f"{origin} did not sign a result: {result[:200]}")
+    verify_response(envelope, contract.address, origin, query)
+    return envelope
+
+# Shortest staleness bound a replica honours; anything tighter would turn
+# every replica read into a read-through to the origin
+MIN_REPLICA_AGE = 5
+
+def serve_cached(request, load):
+    """Answer a replica read from cache, reading through to the origin on a miss"""
+    miss = json.dumps({"miss": True})
+    if replicas is None:
+        return miss
+    origin, query, max_age = request.get("origin"), request.get("query"), request.get("max_age")
+    if not isinstance(origin, str) or not Web3.is_address(origin) or not isinstance(query, str):
+        return "Error: cached reads need an origin address and a query string"
+    if max_age is not None and (isinstance(max_age, bool) or not isinstance(max_age, (int, float))):
+        return "Error: max_age must be a number of seconds"
+    if max_age is not None:
+        max_age = max(max_age, MIN_REPLICA_AGE)
+    envelope = replicas.get(origin, query, max_age)
+    if envelope is None and load < 1.0 and registry is not None:
+        endpoint = registry.endpoint(Web3.to_checksum_address(origin))
+        if endpoint:
+            try:
+                envelope = fetch_signed(endpoint, origin, query)
+                replicas.put(envelope)
+            except Exception as e:
+                print(f"⚠️ Read-through to {origin} failed: {str(e)}")
+    return json.dumps(envelope) if envelope else miss
+
+def cached_read(origin, query, max_age):
+    """Read query's result from a replica within max_age seconds, else from the origin"""
+    adverts = registry.refresh()
+    replica_peers = sorted(
+        (advert["load"], peer) for peer, advert in adverts.items()
+        if advert.get("replica") and peer not in (origin, acct.address)
+    )
+    for _, peer in replica_peers[:2]:
+        try:
+            result, _ = direct_query(
+                registry.endpoints[peer], private_key, contract.address,
+                encode_request("cached", origin=origin, query=query, max_age=max_age), responder=peer
+            )
+            envelope = json.loads(result)
+            if not envelope.get("miss"):
+                return verify_response(envelope, contract.address, origin, query, max_age), envelope, peer
+        except Exception as e:
+            print(f"⚠️ Replica {peer} unusable: {str(e)}")
+    envelope = fetch_signed(registry.endpoints[origin], origin, query)
+    return envelope["result"], envelope, origin
+
+def make_cached_request():
+    if registry is None:
+        print("\n⚠️ Replica reads need the endpoint registry of the full contract")
+        return
+    query = input("\nEnter SQL query: ").strip()
+    if not query:
+        print("❌ Query cannot be empty!")
+        return
+    origin = read_target(query_table(query))
+    if not origin:
+        return
+    try:
+        max_age = int(input("Accept data up to how many seconds old? [default: 60]: ").strip() or "60")
+        registry.discover()
+        if origin not in registry.endpoints:
+            print("❌ Origin peer has not advertised a direct endpoint")
+            return
+        result, envelope, source = cached_read(origin, query, max_age)
+        age = time.time() - envelope["issued_at"]
+        via = "origin" if source == origin else f"replica {source}"
+        print(f"\n🪞 Signed by {origin} via {via}, version {envelope['version']}, {age:.0f}s old")
+        try:
+            for row in json.loads(result):
+                print("   ", row)
+        except (ValueError, TypeError):
+            print(f"   Response: {result}")
+    except Exception as e:
+        print(f"❌ Cached read failed: {str(e)}")
+
+def advertise_endpoint():
+    if contract_variant == "lean":
+        print("   ⚠️ The lean contract has no endpoint registry; share the direct address out of band")
+        return
+    try:
+        if contract.functions.endpoints(acct.address).call() != direct_endpoint:
+            tx_hash = send_transaction(contract.functions.setEndpoint(direct_endpoint))
+            print(f"📣 Advertising direct endpoint {direct_endpoint}, tx: {tx_hash.hex()}")
+    except Exception as e:
+        print(f"❌ Failed to advertise direct endpoint: {str(e)}")
+
+def handle_response_sent(log):
+    event = decode_response_sent(log)
+    history.record_response(event.request_id, event.responder, event.response, event.block_number)
+
+def handle_subscription_created(log):
+    event_data = contract.events.SubscriptionCreated().process_log(log)
+    sub_id = event_data.args.subscriptionId
+    if event_data.args.target.lower() != acct.address.lower():
+        return
+    print(f"\n🔁 New subscription {sub_id} every {event_data.args.interval}s: {event_data.args.dbQuery}")
+    subscriptions.add(
+        sub_id,
+        event_data.args.requester,
+        event_data.args.dbQuery,
+        event_data.args.interval,
+        event_data.blockNumber
+    )
+
+def handle_subscription_cancelled(log):
+    event_data = contract.events.SubscriptionCancelled().process_log(log)
+    if subscriptions.cancel(event_data.args.subscriptionId):
+        print(f"\n🛑 Subscription {event_data.args.subscriptionId} cancelled")
+
+def restore_subscriptions(to_block):
+    """Rebuild the active subscriptions targeting us from their on-chain history"""
+    try:
+        created = contract.events.SubscriptionCreated().get_logs(
+            from_block=0, to_block=to_block, argument_filters={"target": acct.address}
+        )
+        if not created:
+            return
+        cancelled = {
+            event.args.subscriptionId for event in contract.events.SubscriptionCancelled().get_logs(
+                from_block=0, to_block=to_block,
+                argument_filters={"subscriptionId": [event.args.subscriptionId for event in created]}
+            )
+        }
+        for event in created:
+            if event.args.subscriptionId not in cancelled:
+                subscriptions.add(
+                    event.args.subscriptionId,
+                    event.args.requester,
+                    event.args.dbQuery,
+                    event.args.interval,
+                    event.blockNumber
+                )
+        print(f"🔁 Restored {len(subscriptions)} active subscription(s)")
+    except Exception as e:
+        print(f"❌ Could not restore subscriptions: {str(e)}")
+
+def recover_requests():
+    """Re-queue requests accepted before a restart that never got an answer on chain
+
+    The block watermark moves once logs are indexed, but accepted requests may
+    still have been waiting in the scheduler, the deferred queue, the lookup
+    batcher or the signer outbox when the node stopped.
+    """
+    try:
+        cleared = event_index.clear_stale_claims()
+        for req_id, tx_hash in event_index.sent_responses():
+            try:
+                receipt = w3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                try:
+                    w3.eth.get_transaction(tx_hash)
+                    continue  # Still in the mempool; it may yet be mined
+                except TransactionNotFound:
+                    receipt = None
+            if receipt is not None and receipt.status == 1:
+                event_index.mark_response_confirmed(req_id, receipt.blockNumber)
+            else:
+                event_index.release_response(req_id)
+                cleared += 1
+        unanswered = [
+            row for row in event_index.by_target(acct.address, "pending", limit=10000)
+            if not event_index.is_answered(row["request_id"])
+        ]
+        # Oldest first, the order they arrived in
+        for row in reversed(unanswered):
+            schedule_request(row["request_id"], Web3.to_checksum_address(row["requester"]), row["query"])
+        if cleared or unanswered:
+            print(f"🔁 Re-queued {len(unanswered)} unanswered request(s), cleared {cleared} stale claim(s)")
+    except Exception as e:
+        print(f"❌ Could not recover unanswered requests: {str(e)}")
+
+def deliver_subscriptions():
+    batch = subscriptions.collect_due()
+    if not batch:
+        return
+    sub_ids = [sub_id for sub_id, _ in batch]
+    responses = [response for _, response in batch]
+    if response_dictionary is not None:
+        responses = [compress_response(response, response_dictionary) for response in responses]
+    try:
+        # A stuck delivery is superseded by the next one, so let it be cancelled
+        tx_hash = send_transaction(
+            contract.functions.deliverSubscriptions(sub_ids, responses),
+            ttl=120
+        )
+        print(f"📤 Delivered {len(batch)} subscription update(s), tx: {tx_hash.hex()}")
+        confirmer.submit(confirm_delivery, sub_ids, tx_hash)
+    except Exception as e:
+        subscriptions.release(sub_ids)
+        print(f"❌ Failed to deliver subscriptions {sub_ids}: {str(e)}")
+
+def confirm_delivery(sub_ids, tx_hash):
+    # Watermarks only move once the update is on chain; otherwise it is sent again
+    try:
+        receipt = tx_manager.wait_for_receipt(tx_hash, timeout=300)
+        if receipt.status == 1:
+            subscriptions.confirm(sub_ids)
+            return
+        print(f"❌ Subscription delivery {tx_hash.hex()} reverted; will retry")
+    except Exception as e:
+        print(f"❌ Subscription delivery {tx_hash.hex()} not confirmed: {str(e)}")
+    subscriptions.release(sub_ids)
+
+# Off-chain responses are committed on chain as one Merkle root per batch
+BATCH_SIZE = 256
+BATCH_INTERVAL = 30
+batch_state = {"committed_at": time.time()}
+
+def commit_response_batch():
+    if not offchain_responses:
+        return
+    pending = event_index.unbatched_responses(BATCH_SIZE)
+    if not pending or (len(pending) < BATCH_SIZE and time.time() - batch_state["committed_at"] < BATCH_INTERVAL):
+        return
+    batch_state["committed_at"] = time.time()
+    # One bad ID reverts the whole batch, so drop requests the contract would refuse
+    try:
+        statuses = request_statuses(contract, [req_id for req_id, _ in pending])
+    except Exception as e:
+        print(f"❌ Could not check batch request statuses: {str(e)}")
+        return
+    rejected = {
+        req_id for req_id, _ in pending
+        if statuses[req_id][2] or statuses[req_id][1].lower() != acct.address.lower()
+    }
+    if rejected:
+        event_index.reject_responses(rejected)
+        print(f"⚠️ Leaving {len(rejected)} fulfilled or foreign request(s) out of the batch")
+        pending = [(req_id, response) for req_id, response in pending if req_id not in rejected]
+        if not pending:
+            return
+    # The contract rebuilds this root from the same IDs and hashes
+    levels, hashes = signed_responses.batch_tree(pending)
+    root = levels[-1][0]
+    root_hex = "0x" + root.hex()
+    # Proofs are stored first so requesters can collect them as soon as the root lands
+    event_index.record_batch(root_hex, [
+        (req_id, json.dumps(["0x" + node.hex() for node in signed_responses.merkle_proof(levels, i)]))
+        for i, (req_id, _) in enumerate(pending)
+    ])
+    try:
+        tx_hash = send_transaction(contract.functions.commitResponseBatch([req_id for req_id, _ in pending], hashes))
+        print(f"🌳 Committing {len(pending)} response(s) under root {root_hex[:18]}…, tx: {tx_hash.hex()}")
+        confirmer.submit(confirm_batch, root_hex, tx_hash)
+    except Exception as e:
+        event_index.release_batch(root_hex)
+        print(f"❌ Failed to commit response batch: {str(e)}")
+
+def confirm_batch(root_hex, tx_hash):
+    try:
+        receipt = tx_manager.wait_for_receipt(tx_hash, timeout=300)
+        if receipt.status == 1:
+            print(f"✅ Response batch {root_hex[:18]}… confirmed in block {receipt.blockNumber} ({receipt.gasUsed} gas)")
+            return
+        print(f"❌ Response batch {root_hex[:18]}… reverted; its responses will be batched again")
+    except Exception as e:
+        print(f"❌ Response batch {root_hex[:18]}… not confirmed: {str(e)}")
+    event_index.release_batch(root_hex)
+
 def listen_for_requests():
     print("\n🔊 Listening for new requests...")
-    event_abi = contract.events.RequestCreated._get_event_abi()
-    request_created_topic = event_abi_to_log_topic(event_abi)
-    last_block = w3.eth.block_number
+    handlers = {}
+    abi_events = {item["name"] for item in contract.abi if item["type"] == "event"}
+    for name, handler in (
+        ("RequestCreated", handle_request_created),
+        ("ResponseSent", handle_response_sent),
+        ("SubscriptionCreated", handle_subscription_created),
+        ("SubscriptionCancelled", handle_subscription_cancelled)
+    ):
+        # The lean contract variant only has the request/response events
+        if name in abi_events:
+            event_abi = contract.events[name]._get_event_abi()
+            handlers[event_abi_to_log_topic(event_abi)] = handler
+    # Resume after the last block we fully processed, so requests sent while we were down are answered
+    head = w3.eth.block_number
+    last_block = event_index.get_last_block()
+    start_block = head if last_block is None else min(last_block, head)
+    if start_block < head:
+        print(f"⏩ Catching up on blocks {start_block + 1}-{head}")
+    follower = ChainFollower(w3, start_block, confirmations)
+    if "SubscriptionCreated" in abi_events:
+        # Subscriptions live only in memory; pick up the ones created while we were down
+        restore_subscriptions(follower.last_block)
+    recover_requests()
     
     while True:
         try:
-            current_block = w3.eth.block_number
-            if current_block > last_block:
-                for block_num in range(last_block + 1, current_block + 1):
-                    block = w3.eth.get_block(block_num, full_transactions=True)
-                    for tx in block.transactions:
-                        if tx.to and tx.to.lower() == contract.address.lower():
-                            receipt = w3.eth.get_transaction_receipt(tx.hash)
-                            for log in receipt['logs']:
-                                if log['topics'] and log['topics'][0] == request_created_topic:
-                                    try:
-                                        event_data = contract.events.RequestCreated().process_log(log)
-                                        req_id = event_data.args.requestId
-                                        target = event_data.args.target
-                                        db_query = event_data.args.dbQuery
-                                        
-                                        # Only respond if we're the target
-                                        if target.lower() == acct.address.lower():
-                                            print(f"\n📩 New request {req_id} (TARGETED): {db_query}")
-                                            response = handle_query(db_path, db_query)
-                                            send_response(req_id, response)
-                                        else:
-                                            print(f"⚠️ Request {req_id} not for this peer (target: {target})")
-                                    except Exception as e:
-                                        print(f"⚠️ Event processing error: {str(e)}")
-                last_block = current_block
+            fork_block, blocks = follower.poll()
+            if fork_block is not None:
+                print(f"\n🔀 Chain reorganisation detected, rolling back to block {fork_block}")
+                event_index.rollback(fork_block)
+                history.rollback(fork_block)
+                subscriptions.rollback(fork_block)
+            for block in blocks:
+                for tx in block.transactions:
+                    if tx.to and tx.to.lower() == contract.address.lower():
+                        receipt = w3.eth.get_transaction_receipt(tx.hash)
+                        for log in receipt['logs']:
+                            handler = handlers.get(log['topics'][0]) if log['topics'] else None
+                            if handler:
+                                try:
+                                    handler(log)
+                                except Exception as e:
+                                    print(f"⚠️ Event processing error: {str(e)}")
+                follower.commit(block)
+            if blocks:
+                history.flush()
+                event_index.set_last_block(follower.last_block)
+            deliver_subscriptions()
+            commit_response_batch()
             time.sleep(2)
         except Exception as e:
             print(f"⚠️ Event listening error: {str(e)}")
             time.sleep(5)
 
-def send_response(req_id, response):
+def process_requests():
+    """Execute scheduled requests in fair order, separately from log ingestion"""
+    while True:
+        try:
+            item = scheduler.get(timeout=1)
+            started = time.time()
+            if item is not None:
+                execute_request(*item)
+            # Idle polls count as zero latency so the estimate recovers once work stops
+            admission.record_db_latency(time.time() - started)
+            for deferred in admission.release(len(scheduler), pending_transactions()):
+                schedule_request(*deferred)
+            # Answer every lookup gathered since the queue last drained with one query per table
+            if len(batcher) and (item is None or len(scheduler) == 0 or len(batcher) >= 100):
+                print(f"🔎 Running {len(batcher)} batched lookup(s)")
+                for req_id, response in batcher.flush(db_path).items():
+                    send_response(req_id, response)
+        except Exception as e:
+            print(f"⚠️ Request processing error: {str(e)}")
+
+def show_scheduler_stats():
+    stats = scheduler.snapshot()
+    totals = stats["totals"]
+    print(f"\n🚦 Scheduler: {totals['waiting']} waiting, {totals['dispatched']} dispatched, "
+          f"{totals['deferred']} deferred, {totals['dropped']} dropped")
+    print(f"   Admission: {admission.stats['accept']} accepted, {admission.stats['defer']} deferred "
+          f"({len(admission.deferred)} waiting), {admission.stats['busy']} busy, {admission.stats['drop']} dropped, "
+          f"load {admission.load(len(scheduler), pending_transactions()):.2f}")
+    if replicas is not None:
+        print(f"   Replica cache: {len(replicas)} response(s), {replicas.size / 1024:.0f} KiB, "
+              f"{replicas.stats['hits']} hits, {replicas.stats['misses']} misses, {replicas.stats['evicted']} evicted")
+    records, size = history.memory()
+    print(f"   History: {records} request(s) in memory, {size / 1024:.0f} KiB")
+    for requester, counts in stats["requesters"].items():
+        print(f"   {requester}: {counts['waiting']} waiting, {counts['dispatched']} dispatched, "
+              f"{counts['deferred']} deferred, {counts['dropped']} dropped")
+
+def show_endpoints():
+    if not isinstance(w3.provider, ProviderPool):
+        print(f"\n🌐 Single endpoint: {ganache_url}")
+        return
+    print("\n🌐 RPC endpoints:")
+    for endpoint in w3.provider.status():
+        state = '✅' if endpoint["healthy"] else '❌'
+        role = " (writes)" if endpoint["writes"] else ""
+        print(f"   {state} {endpoint['url']}{role}: {endpoint['latency_ms']} ms, "
+              f"errors {endpoint['error_rate']:.1%}, block {endpoint['block']}")
+
+def send_transaction(fn, ttl=None):
+    """Estimate, sign and broadcast a contract call; returns the tx hash"""
+    return tx_manager.send(fn, ttl)
+
+def send_response(req_id, response, on_delivered=None):
+    # The ledger makes sure each request is answered at most once, even across replays
+    if not event_index.claim_response(req_id):
+        print(f"↩️ Request {req_id} already answered, skipping")
+        return
+    if response_dictionary is not None:
+        response = compress_response(response, response_dictionary)
+    if offchain_responses:
+        # The signature is the proof of who answered; the requester collects it directly
+        signature = signed_responses.sign_response(private_key, contract.address, req_id, response)
+        event_index.store_signed_response(req_id, response, signature)
+        print(f"✍️ Signed response for request {req_id} ready for collection")
+        if on_delivered:
+            on_delivered()
+        return
     try:
-        
-        gas_estimate = contract.functions.submitResponse(req_id, response).estimate_gas({
-            'from': acct.address
-        })
-        
-        tx = contract.functions.submitResponse(req_id, response).build_transaction({
-            'from': acct.address,
-            'nonce': w3.eth.get_transaction_count(acct.address),
-            'gas': gas_estimate + 50000,
-            'gasPrice': w3.to_wei('10', 'gwei')
-        })
-        
-        signed = w3.eth.account.sign_transaction(tx, private_key)
-        tx_hash = w3.eth.send_raw_transaction(signed.raw_transaction)
+        # Signing and confirmation happen off the listener thread
+        sender = responder_pool.pick() if responder_pool else tx_manager
+        signed_tx = signer.submit(sender, response_template, req_id, response)
+        confirmer.submit(confirm_response, req_id, sender, signed_tx, on_delivered)
+    except Exception as e:
+        event_index.release_response(req_id)
+        print(f"❌ Failed to send response: {str(e)}")
+
+def confirm_response(req_id, sender, signed_tx, on_delivered=None):
+    try:
+        tx_hash = signed_tx.result()
+        event_index.mark_response_sent(req_id, tx_hash.hex())
         print(f"📤 Response submitted for request {req_id}, tx: {tx_hash.hex()}")
         
         
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
+        receipt = sender.wait_for_receipt(tx_hash, timeout=120)
         if receipt.status == 1:
+            event_index.mark_response_confirmed(req_id, receipt.blockNumber)
             print(f"✅ Response confirmed in block {receipt.blockNumber}")
+            if on_delivered:
+                on_delivered()
         else:
+            event_index.release_response(req_id)
             print("❌ Transaction failed")
     except Exception as e:
+        event_index.release_response(req_id)
         print(f"❌ Failed to send response: {str(e)}")
 
+def submit_request(target_checksum, query):
+    try:
+        tx_hash = send_transaction(contract.functions.createRequest(target_checksum, query))
+        print(f"📨 Request sent to {target_checksum}, tx: {tx_hash.hex()}")
+        print("   Use 'response <id>' to check later")
+        
+        
+        receipt = tx_manager.wait_for_receipt(tx_hash, timeout=120)
+        if receipt.status == 1:
+            print(f"✅ Request confirmed in block {receipt.blockNumber}")
+        else:
+            print("❌ Transaction failed")
+    except Exception as e:
+        print(f"❌ Failed to send request: {str(e)}")
+
+def read_target(table=None, keys=()):
+    if table is None or registry is None:
+        target_address = input("Enter target peer address: ").strip()
+    else:
+        target_address = input("Enter target peer address [blank: auto-route]: ").strip()
+        if not target_address:
+            return route_target(table, keys)
+    if not w3.is_address(target_address):
+        print("❌ Invalid Ethereum address")
+        return None
+    return w3.to_checksum_address(target_address)
+
+def route_target(table, keys=()):
+    try:
+        peers = registry.route(table, exclude=(acct.address,), keys=keys)
+    except Exception as e:
+        print(f"❌ Routing failed: {str(e)}")
+        return None
+    if not peers:
+        print(f"❌ No known peer advertises {table}{' with those keys' if keys else ''}")
+        return None
+    print(f"🧭 Routing to {peers[0]} (load {registry.adverts[peers[0]]['load']:.2f})")
+    return peers[0]
+
+def show_peers():
+    if registry is None:
+        print("\n⚠️ The lean contract has no endpoint registry")
+        return
+    adverts = registry.refresh(force=True)
+    print(f"\n🧭 {len(adverts)} peer(s) advertising capabilities:")
+    for peer, advert in adverts.items():
+        print(f"   {peer} @ {registry.endpoints.get(peer)}: load {advert['load']:.2f}, "
+              f"schema {advert['schema_hash'][:12]}")
+        for table, info in advert["tables"].items():
+            print(f"      {table}: {info['rows']} rows{', key filter' if info.get('key_bloom') else ''}")
+
 def make_request():
     query = input("\nEnter SQL query: ").strip()
     if not query:
@@ -207,75 +1127,290 @@ def make_request():
         return
     
     
-    target_address = input("Enter target peer address: ").strip()
-    if not w3.is_address(target_address):
+    target_checksum = read_target(query_table(query))
+    if target_checksum:
+        submit_request(target_checksum, query)
+
+def make_direct_request():
+    query = input("\nEnter SQL query: ").strip()
+    if not query:
+        print("❌ Query cannot be empty!")
+        return
+    target_checksum = read_target(query_table(query))
+    if not target_checksum:
+        return
+    try:
+        endpoint = input("Peer endpoint host:port [default: from chain]: ").strip()
+        if not endpoint and contract_variant != "lean":
+            endpoint = contract.functions.endpoints(target_checksum).call()
+        if not endpoint:
+            print("❌ Peer has not advertised a direct endpoint")
+            return
+        started = time.time()
+        result, commitment = direct_query(endpoint, private_key, contract.address, query, responder=target_checksum)
+        print(f"\n⚡ {commitment['size']} bytes from {endpoint} in {time.time() - started:.2f}s")
+        try:
+            for row in json.loads(result):
+                print("   ", row)
+        except (ValueError, TypeError):
+            print(f"   Response: {result}")
+        if contract_variant == "lean":
+            return
+        if input("Record commitment on chain? (y/N): ").strip().lower() == "y":
+            tx_hash = send_transaction(contract.functions.commitTransfer(
+                commitment["responder"],
+                commitment["query_hash"],
+                commitment["result_hash"],
+                commitment["size"],
+                commitment["nonce"],
+                commitment["signature"]
+            ))
+            receipt = tx_manager.wait_for_receipt(tx_hash, timeout=120)
+            if receipt.status == 1:
+                transfer_id = contract.events.TransferCommitted().process_receipt(receipt)[0].args.transferId
+                print(f"✅ Commitment recorded as transfer {transfer_id}")
+            else:
+                print("❌ Transaction failed")
+    except Exception as e:
+        print(f"❌ Direct query failed: {str(e)}")
+
+def make_lookup():
+    table = input("\nEnter table [default: data]: ").strip() or "data"
+    keys = [k.strip() for k in input("Enter keys (comma-separated): ").split(",") if k.strip()]
+    if not keys:
+        print("❌ At least one key is required!")
+        return
+    
+    target_checksum = read_target(table, keys)
+    if target_checksum:
+        submit_request(target_checksum, encode_request("lookup", table=table, keys=keys))
+
+def make_poll():
+    table = input("\nEnter table [default: data]: ").strip() or "data"
+    keys = [k.strip() for k in input("Enter keys (comma-separated, blank for all): ").split(",") if k.strip()]
+    watermark = input("Enter watermark [blank: responder-tracked]: ").strip()
+    
+    target_checksum = read_target(table, keys)
+    if not target_checksum:
+        return
+    fields = {"table": table, "keys": keys}
+    if watermark:
+        fields["watermark"] = int(watermark)
+    submit_request(target_checksum, encode_request("delta", **fields))
+
+def make_broadcast():
+    if contract_variant == "lean":
+        print("\n⚠️ The lean contract has no createRequests; broadcast needs the full contract")
+        return
+    query = input("\nEnter SQL query: ").strip()
+    if not query:
+        print("❌ Query cannot be empty!")
+        return
+    targets = [t.strip() for t in input("Enter target peer addresses (comma-separated): ").split(",") if t.strip()]
+    if not targets and registry is not None and query_table(query):
+        # Every peer that advertises the table
+        targets = registry.route(query_table(query), exclude=(acct.address,))
+        print(f"🧭 Routing to {len(targets)} peer(s) holding {query_table(query)}")
+    if not targets or not all(w3.is_address(t) for t in targets):
         print("❌ Invalid Ethereum address")
         return
-    target_checksum = w3.to_checksum_address(target_address)
-        
+    mode = input("Merge mode (union/sorted/sum/avg) [default: union]: ").strip() or "union"
+    column = int(input("Column index for sorted/sum/avg [default: 0]: ").strip() or "0")
+    deadline = int(input("Deadline in seconds [default: 60]: ").strip() or "60")
+    
     try:
-        
-        gas_estimate = contract.functions.createRequest(
-            target_checksum,
-            query
-        ).estimate_gas({
-            'from': acct.address
-        })
-        
-        tx = contract.functions.createRequest(
-            target_checksum,
-            query
-        ).build_transaction({
-            'from': acct.address,
-            'nonce': w3.eth.get_transaction_count(acct.address),
-            'gas': gas_estimate + 50000,
-            'gasPrice': w3.to_wei('10', 'gwei')
-        })
-        
-        signed = w3.eth.account.sign_transaction(tx, private_key)
-        tx_hash = w3.eth.send_raw_transaction(signed.raw_transaction)
-        print(f"📨 Request sent to {target_address}, tx: {tx_hash.hex()}")
-        print("   Use 'response <id>' to check later")
-        
-        
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
+        print(f"📨 Sending query to {len(targets)} peers...")
+        merged = scatter_gather(
+            contract, send_transaction, tx_manager.wait_for_receipt,
+            [w3.to_checksum_address(t) for t in targets],
+            query, mode, column, deadline
+        )
+        print(f"\n📊 {len(merged['responded'])}/{len(targets)} peers responded")
+        for target in merged["missing"]:
+            print(f"   ⌛ No response from {target}")
+        for error in merged["errors"]:
+            print(f"   ⚠️ {error}")
+        if isinstance(merged["result"], list):
+            for row in merged["result"]:
+                print("   ", row)
+        else:
+            print(f"   {mode}: {merged['result']}")
+    except Exception as e:
+        print(f"❌ Failed to broadcast request: {str(e)}")
+
+def make_subscription():
+    table = input("\nEnter table [default: data]: ").strip() or "data"
+    keys = [k.strip() for k in input("Enter keys (comma-separated, blank for all): ").split(",") if k.strip()]
+    try:
+        interval = int(input("Enter interval in seconds [default: 60]: ").strip() or "60")
+    except ValueError:
+        print("❌ Interval must be a number")
+        return
+    
+    target_checksum = read_target()
+    if not target_checksum:
+        return
+    query = encode_request("delta", table=table, keys=keys)
+    try:
+        tx_hash = send_transaction(contract.functions.createSubscription(target_checksum, query, interval))
+        receipt = tx_manager.wait_for_receipt(tx_hash, timeout=120)
         if receipt.status == 1:
-            print(f"✅ Request confirmed in block {receipt.blockNumber}")
+            event_data = contract.events.SubscriptionCreated().process_receipt(receipt)[0]
+            print(f"✅ Subscription {event_data.args.subscriptionId} created in block {receipt.blockNumber}")
         else:
             print("❌ Transaction failed")
     except Exception as e:
-        print(f"❌ Failed to send request: {str(e)}")
+        print(f"❌ Failed to create subscription: {str(e)}")
+
+def cancel_subscription():
+    try:
+        sub_id = int(input("Enter subscription ID: "))
+        tx_hash = send_transaction(contract.functions.cancelSubscription(sub_id))
+        receipt = tx_manager.wait_for_receipt(tx_hash, timeout=120)
+        if receipt.status == 1:
+            print(f"✅ Subscription {sub_id} cancelled")
+        else:
+            print("❌ Transaction failed")
+    except Exception as e:
+        print(f"❌ Failed to cancel subscription: {str(e)}")
+
+def get_deliveries():
+    try:
+        sub_id = int(input("Enter subscription ID: "))
+        deliveries = contract.events.SubscriptionDelivered().get_logs(
+            from_block=0,
+            argument_filters={'subscriptionId': sub_id}
+        )
+        print(f"\n📬 {len(deliveries)} deliveries for subscription {sub_id}")
+        for event in deliveries:
+            print(f"   Block {event.blockNumber}: {decompress_response(event.args.response)}")
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+
+def show_indexed(rows, title):
+    print(f"\n🗂️  {title}: {len(rows)}")
+    for row in rows:
+        status = '✅' if row["status"] == "fulfilled" else '⌛'
+        print(f"   {status} #{row['request_id']} → {row['target']}: {row['query']}")
+
+def run_backfill():
+    try:
+        last_block = event_index.get_last_block()
+        default = last_block + 1 if last_block is not None else 0
+        from_block = int(input(f"From block [default: {default}]: ") or default)
+        to_block = w3.eth.block_number
+        history.flush()
+        print(f"\n🔙 Backfilling blocks {from_block}-{to_block}")
+        requests, responses = backfill(w3, contract.address, event_index, from_block, to_block)
+        print(f"✅ Indexed {requests} requests and {responses} responses")
+    except Exception as e:
+        print(f"❌ Backfill failed: {str(e)}")
+
+def check_outstanding():
+    try:
+        outstanding = event_index.by_requester(acct.address, "pending", limit=10000)
+        if not outstanding:
+            print("\n📭 No outstanding requests")
+            return
+        started = time.time()
+        statuses = request_statuses(contract, [row["request_id"] for row in outstanding])
+        answered = [req_id for req_id, (_, _, fulfilled) in statuses.items() if fulfilled]
+        print(f"\n📊 Checked {len(statuses)} outstanding request(s) in {time.time() - started:.2f}s: "
+              f"{len(answered)} answered on chain, {len(statuses) - len(answered)} still pending")
+        if answered:
+            print(f"   Answered: {', '.join(str(req_id) for req_id in answered[:20])}"
+                  f"{' ...' if len(answered) > 20 else ''}")
+    except Exception as e:
+        print(f"❌ Status check failed: {str(e)}")
+
+def list_requests(cmd):
+    if cmd == "mine":
+        show_indexed(event_index.by_requester(acct.address, "pending"), "Outstanding requests")
+    elif cmd == "history":
+        show_indexed(event_index.by_requester(acct.address), "Recent requests")
+    else:
+        show_indexed(event_index.by_target(acct.address), "Requests targeting this peer")
 
 def get_response():
     try:
         req_id = int(input("Enter request ID: "))
-        req = contract.functions.getRequest(req_id).call()
+        record = history.get(req_id)
+        indexed = None if record and record.fulfilled else event_index.get(req_id)
+        if record and record.fulfilled and record.requester:
+            req = record.as_request()
+        elif indexed and indexed["status"] == "fulfilled" and indexed["requester"]:
+            # Fulfilled requests never change, so the local index is authoritative
+            req = (indexed["requester"], indexed["target"], indexed["query"], True, indexed["response"])
+        elif contract_variant == "lean":
+            # Payloads are only in event logs; storage holds their hashes
+            req = get_lean_request(contract, req_id)
+        else:
+            req = contract.functions.getRequest(req_id).call()
         print(f"\n🔍 Request {req_id} details:")
         print(f"   Requester: {req[0]}")
         print(f"   Target: {req[1]}")
         print(f"   Query: {req[2]}")
         print(f"   Status: {'✅ Fulfilled' if req[3] else '⌛ Pending'}")
         if req[3] and req[4]:
+            response = decompress_response(req[4])
+            if response != req[4]:
+                print(f"   Compressed: {len(req[4])} bytes on chain, {len(response)} decoded")
             try:
-                parsed = json.loads(req[4])
+                parsed = json.loads(response)
                 print("   Response (parsed):")
+                if isinstance(parsed, dict) and parsed.get("busy"):
+                    print(f"   🛑 Peer was busy, retry after {parsed['retry_after']}s")
+                    parsed = []
+                if isinstance(parsed, dict) and "rows" in parsed:
+                    print(f"   Watermark: {parsed['watermark']}{' (more pending)' if parsed.get('more') else ''}")
+                    parsed = parsed["rows"]
                 for row in parsed:
                     print("   ", row)
             except:
-                print(f"   Response: {req[4]}")
+                print(f"   Response: {response}")
     except Exception as e:
         print(f"❌ Error: {str(e)}")
 
 # --- Main Loop ---
 if __name__ == "__main__":
     threading.Thread(target=listen_for_requests, daemon=True).start()
+    threading.Thread(target=process_requests, daemon=True).start()
+    threading.Thread(
+        target=tx_manager.run,
+        kwargs={'others': responder_pool.managers if responder_pool else ()},
+        daemon=True
+    ).start()
+    if direct_endpoint:
+        direct_server = DirectServer(
+            "0.0.0.0", parse_endpoint(direct_endpoint)[1], private_key, contract.address, handle_direct
+        )
+        direct_server.start()
+        print(f"\n⚡ Direct transport listening on port {direct_server.port}")
+        advertise_endpoint()
     
     print("\n" + "="*50)
     print("PEER NODE COMMANDS")
     print("="*50)
     print("request   - Make new data request")
+    print("lookup    - Fetch several keys in one request")
+    print("direct    - Query a peer directly, off chain")
+    print("cached    - Read from a replica within a staleness bound")
+    print("broadcast - Query many peers and merge the results")
+    print("poll      - Fetch only rows newer than the last poll")
+    print("subscribe - Register a standing delta query")
+    print("unsubscribe - Cancel a standing query")
+    print("deliveries - Show updates for a subscription")
     print("response  - Check request status")
+    print("mine      - List my outstanding requests")
+    print("peers     - Show peer capabilities and load")
+    print("status    - Check all outstanding requests on chain in bulk")
+    print("collect   - Fetch and verify signed off-chain responses")
+    print("history   - List my recent requests")
+    print("inbox     - List requests sent to this peer")
     print("balance   - Show account balance")
+    print("stats     - Show request scheduler counters")
+    print("endpoints - Show RPC endpoint health")
+    print("backfill  - Index past requests from event logs")
     print("exit      - Shutdown node")
     print("="*50)
     
@@ -285,8 +1420,38 @@ if __name__ == "__main__":
             
             if cmd == "request":
                 make_request()
+            elif cmd == "lookup":
+                make_lookup()
+            elif cmd == "broadcast":
+                make_broadcast()
+            elif cmd == "poll":
+                make_poll()
+            elif cmd == "subscribe":
+                make_subscription()
+            elif cmd == "unsubscribe":
+                cancel_subscription()
+            elif cmd == "deliveries":
+                get_deliveries()
             elif cmd == "response":
                 get_response()
+            elif cmd in ("mine", "history", "inbox"):
+                list_requests(cmd)
+            elif cmd == "stats":
+                show_scheduler_stats()
+            elif cmd == "direct":
+                make_direct_request()
+            elif cmd == "peers":
+                show_peers()
+            elif cmd == "cached":
+                make_cached_request()
+            elif cmd == "collect":
+                fetch_signed_responses()
+            elif cmd == "status":
+                check_outstanding()
+            elif cmd == "endpoints":
+                show_endpoints()
+            elif cmd == "backfill":
+                run_backfill()
             elif cmd == "balance":
                 balance = w3.eth.get_balance(acct.address)
                 print(f"💰 Balance: {w3.from_wei(balance, 'ether')} ETH")
@@ -294,7 +1459,7 @@ if __name__ == "__main__":
                 print("Shutting down...")
                 break
             else:
-                print("❌ Invalid command. Options: request, response, balance, exit")
+                print("❌ Invalid command. Options: request, lookup, direct, cached, broadcast, poll, subscribe, unsubscribe, deliveries, response, mine, peers, status, collect, history, inbox, balance, stats, endpoints, backfill, exit")
         except KeyboardInterrupt:
             print("\nShutting down...")
             break
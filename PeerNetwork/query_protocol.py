@@ -0,0 +1,22 @@
+import json
+
+# Structured request payloads are JSON objects carried in the dbQuery string.
+# Plain SQL never starts with "{", so raw queries keep working unchanged.
+
+def encode_request(op, **fields):
+    """Build a structured request payload for createRequest"""
+    payload = {"op": op}
+    payload.update(fields)
+    return json.dumps(payload, separators=(",", ":"))
+
+def decode_request(db_query):
+    """Return the structured request dict, or None for a raw SQL query"""
+    if not db_query.lstrip().startswith("{"):
+        return None
+    try:
+        payload = json.loads(db_query)
+    except ValueError:
+        return None
+    if isinstance(payload, dict) and "op" in payload:
+        return payload
+    return None
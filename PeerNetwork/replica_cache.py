@@ -0,0 +1,156 @@
+import time
+import threading
+from collections import OrderedDict
+from web3 import Web3
+from batch_lookup import IDENTIFIER
+from direct_transport import sign_digest, recover_signer
+
+# Signed responses that any peer may cache and re-serve. The origin signs
+# (query hash, result hash, data version, issue time), so a replica can hand
+# the envelope to anyone and the requester still knows who produced the data
+# and how old it is.
+
+VERSION_SCHEMA = "CREATE TABLE IF NOT EXISTS data_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+VERSION_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS "data_version_{event}_{table}" AFTER {event} ON "{table}" BEGIN
+    INSERT INTO data_versions (name, version) VALUES ('{table}', 1)
+    ON CONFLICT (name) DO UPDATE SET version = version + 1;
+END
+"""
+STRAY_TRIGGERS = (
+    "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'data\\_version\\_%' ESCAPE '\\' "
+    "AND (tbl_name = 'data_versions' OR tbl_name LIKE 'delta\\_%' ESCAPE '\\')"
+)
+_versioned = set()
+_versioned_lock = threading.Lock()
+
+def response_digest(contract_address, origin, query_hash, result_hash, version, issued_at):
+    return Web3.solidity_keccak(
+        ["address", "address", "bytes32", "bytes32", "uint256", "uint256"],
+        [Web3.to_checksum_address(contract_address), Web3.to_checksum_address(origin),
+         query_hash, result_hash, version, issued_at]
+    )
+
+def data_version(store, table):
+    """Count of writes to table since it was first versioned, kept by triggers.
+
+    Every insert, update and delete bumps it, so it only ever grows. Read it
+    before running the query: the result is then at least this new. Only
+    tables of the peer's own schema get triggers; the name comes from remote
+    queries, and a trigger on data_versions itself would recurse forever.
+    """
+    try:
+        with _versioned_lock:
+            if (store.db_path, table) not in _versioned:
+                if not IDENTIFIER.match(table) or table == "data_versions" or table.startswith(("delta_", "sqlite_")):
+                    raise ValueError(f"{table} can't be versioned")
+                conn = store.connection()
+                if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone():
+                    raise ValueError(f"no such table: {table}")
+                with conn:
+                    conn.execute(VERSION_SCHEMA)
+                    # Clear out triggers that an unchecked name once put on internal tables
+                    for (name,) in conn.execute(STRAY_TRIGGERS).fetchall():
+                        conn.execute(f'DROP TRIGGER "{name}"')
+                    for event in ("INSERT", "UPDATE", "DELETE"):
+                        conn.execute(VERSION_TRIGGER.format(event=event, table=table))
+                _versioned.add((store.db_path, table))
+        rows = store.execute("SELECT version FROM data_versions WHERE name = ?", (table,))
+        return rows[0][0] if rows else 0
+    except Exception:
+        return 0
+
+def sign_response(private_key, origin, contract_address, query, result, version):
+    """Envelope for result, signed by the origin peer"""
+    issued_at = int(time.time())
+    digest = response_digest(
+        contract_address, origin, Web3.keccak(text=query), Web3.keccak(text=result), version, issued_at
+    )
+    return {
+        "origin": origin,
+        "query": query,
+        "result": result,
+        "version": version,
+        "issued_at": issued_at,
+        "signature": "0x" + bytes(sign_digest(private_key, digest)).hex()
+    }
+
+def verify_response(envelope, contract_address, origin, query, max_age=None, now=None):
+    """Return the envelope's result if origin signed it for query within max_age seconds"""
+    if envelope["origin"].lower() != origin.lower() or envelope["query"] != query:
+        raise ValueError("Envelope is for a different origin or query")
+    age = (now or time.time()) - envelope["issued_at"]
+    if max_age is not None and age > max_age:
+        raise ValueError(f"Envelope is {age:.0f}s old, bound is {max_age}s")
+    digest = response_digest(
+        contract_address, origin, Web3.keccak(text=query), Web3.keccak(text=envelope["result"]),
+        envelope["version"], envelope["issued_at"]
+    )
+    signer = recover_signer(digest, bytes.fromhex(envelope["signature"][2:]))
+    if signer.lower() != origin.lower():
+        raise ValueError(f"Envelope signed by {signer}, not {origin}")
+    return envelope["result"]
+
+class ReplicaCache:
+    """LRU of signed envelopes bounded by total result bytes and age"""
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, max_age=300):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.entries = OrderedDict()
+        self.size = 0
+        self.purged_at = 0
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evicted": 0}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def put(self, envelope):
+        key = (envelope["origin"].lower(), envelope["query"])
+        cost = len(envelope["result"]) + len(envelope["query"])
+        if cost > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old["result"]) + len(old["query"])
+                # Never replace a newer copy with an older one from another replica. The
+                # origin's clock orders its own envelopes; versions alone can't, since
+                # one may be read before a write and the next after it.
+                if old["issued_at"] > envelope["issued_at"]:
+                    envelope = old
+                    cost = len(old["result"]) + len(old["query"])
+            self.entries[key] = envelope
+            self.size += cost
+            self._evict(time.time())
+
+    def get(self, origin, query, max_age=None):
+        """Freshest cached envelope no older than max_age (and the cache's own bound)"""
+        now = time.time()
+        bound = self.max_age if max_age is None else min(max_age, self.max_age)
+        key = (origin.lower(), query)
+        with self.lock:
+            envelope = self.entries.get(key)
+            if envelope is None or now - envelope["issued_at"] > bound:
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return envelope
+
+    def _evict(self, now):
+        # Oldest-used first until under the size bound
+        while self.size > self.max_bytes and self.entries:
+            self._drop(next(iter(self.entries)))
+        # Expired entries are never served, so sweeping them out can wait a while
+        if now - self.purged_at < 10:
+            return
+        self.purged_at = now
+        for key in [key for key, envelope in self.entries.items() if now - envelope["issued_at"] > self.max_age]:
+            self._drop(key)
+
+    def _drop(self, key):
+        envelope = self.entries.pop(key)
+        self.size -= len(envelope["result"]) + len(envelope["query"])
+        self.stats["evicted"] += 1
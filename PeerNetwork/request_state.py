@@ -0,0 +1,145 @@
+import sys
+import threading
+
+# Record flags
+FULFILLED = 1
+DIRTY = 2  # changed since it was last written to the index
+
+_addresses = {}
+
+def pack_address(address):
+    """20-byte form of an address, shared between every record that mentions it"""
+    if address is None:
+        return None
+    raw = bytes.fromhex(address[2:].lower())
+    return _addresses.setdefault(raw, raw)
+
+def unpack_address(raw):
+    return "0x" + raw.hex() if raw is not None else None
+
+class RequestRecord:
+    __slots__ = (
+        "request_id", "requester", "target", "responder", "flags",
+        "created_block", "fulfilled_block", "query", "response"
+    )
+
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.requester = None
+        self.target = None
+        self.responder = None
+        self.flags = 0
+        self.created_block = None
+        self.fulfilled_block = None
+        self.query = None
+        self.response = None
+
+    @property
+    def fulfilled(self):
+        return bool(self.flags & FULFILLED)
+
+    def as_request(self):
+        """Same shape as getRequest: (requester, target, query, fulfilled, response)"""
+        return (unpack_address(self.requester), unpack_address(self.target), self.query, self.fulfilled, self.response)
+
+    def size(self):
+        """Bytes owned by this record; shared addresses are not counted"""
+        total = sys.getsizeof(self) + sys.getsizeof(self.request_id)
+        for value in (self.created_block, self.fulfilled_block, self.query, self.response):
+            if value is not None:
+                total += sys.getsizeof(value)
+        return total
+
+class RequestHistory:
+    """Ring buffer of recently seen requests that spills to the event index"""
+
+    def __init__(self, index, capacity=10000):
+        self.index = index
+        self.capacity = capacity
+        self.ring = [None] * capacity
+        self.head = 0
+        self.records = {}
+        self.dirty = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.records)
+
+    def _record(self, req_id):
+        record = self.records.get(req_id)
+        if record is None:
+            record = RequestRecord(req_id)
+            evicted = self.ring[self.head]
+            if evicted is not None:
+                del self.records[evicted.request_id]
+                if self.dirty.pop(evicted.request_id, None) is not None:
+                    self._spill([evicted])
+            self.ring[self.head] = record
+            self.head = (self.head + 1) % self.capacity
+            self.records[req_id] = record
+        record.flags |= DIRTY
+        self.dirty[req_id] = record
+        return record
+
+    def record_request(self, req_id, requester, target, query, block_number):
+        with self.lock:
+            record = self._record(req_id)
+            record.requester = pack_address(requester)
+            record.target = pack_address(target)
+            record.query = query
+            record.created_block = block_number
+
+    def record_response(self, req_id, responder, response, block_number):
+        with self.lock:
+            record = self._record(req_id)
+            record.responder = pack_address(responder)
+            record.response = response
+            record.fulfilled_block = block_number
+            record.flags |= FULFILLED
+
+    def get(self, req_id):
+        with self.lock:
+            return self.records.get(req_id)
+
+    def flush(self):
+        """Write every changed record to the index in one transaction"""
+        with self.lock:
+            if self.dirty:
+                self._spill(list(self.dirty.values()))
+                self.dirty.clear()
+
+    def _spill(self, records):
+        requests = [
+            (r.request_id, unpack_address(r.requester), unpack_address(r.target), r.query, r.created_block)
+            for r in records if r.created_block is not None
+        ]
+        responses = [
+            (r.request_id, unpack_address(r.responder), r.response, r.fulfilled_block)
+            for r in records if r.flags & FULFILLED
+        ]
+        self.index.record_many(requests, responses)
+        for record in records:
+            record.flags &= ~DIRTY
+
+    def rollback(self, block_number):
+        """Mirror EventIndex.rollback for records still held in memory"""
+        with self.lock:
+            for record in self.records.values():
+                if record.created_block is not None and record.created_block > block_number:
+                    record.requester = record.target = record.query = record.created_block = None
+                if record.fulfilled_block is not None and record.fulfilled_block > block_number:
+                    record.responder = record.response = record.fulfilled_block = None
+                    record.flags &= ~FULFILLED
+            # Orphaned records that never made it to the index have nothing left to write
+            for req_id, record in list(self.dirty.items()):
+                if record.created_block is None and not record.flags & FULFILLED:
+                    record.flags &= ~DIRTY
+                    del self.dirty[req_id]
+
+    def memory(self):
+        """(records, total bytes) held by the buffer, including its containers"""
+        with self.lock:
+            total = sys.getsizeof(self.ring) + sys.getsizeof(self.records) + sys.getsizeof(self.dirty)
+            total += sum(record.size() for record in self.records.values())
+            total += sum(sys.getsizeof(raw) for raw in _addresses.values())
+            return len(self.records), total
@@ -0,0 +1,52 @@
+import time
+import hashlib
+from collections import OrderedDict
+
+def responder_order(req_id, peers):
+    """Rendezvous-hash ranking of peers for a request; identical on every peer"""
+    return sorted(
+        peers,
+        key=lambda peer: hashlib.sha256(f"{req_id}:{peer}".encode()).digest(),
+        reverse=True
+    )
+
+class ResponderElection:
+    """Let exactly one peer answer each untargeted request, with timed failover"""
+
+    def __init__(self, me, peers, grace=10, retain=600):
+        self.me = me.lower()
+        self.peers = sorted({peer.lower() for peer in peers} | {self.me}) if peers else []
+        self.grace = grace
+        # Fulfilled IDs only matter while their request could still be offered,
+        # so each is kept for `retain` seconds, oldest first
+        self.retain = retain
+        self.fulfilled = OrderedDict()
+        self.deferred = {}
+
+    def note_fulfilled(self, req_id, now=None):
+        now = time.time() if now is None else now
+        self.fulfilled[req_id] = now
+        self.fulfilled.move_to_end(req_id)
+        self.deferred.pop(req_id, None)
+        while self.fulfilled and next(iter(self.fulfilled.values())) < now - self.retain:
+            self.fulfilled.popitem(last=False)
+
+    def offer(self, req_id, db_query, now=None):
+        """True if this peer should answer now; otherwise the request waits as a backup"""
+        if req_id in self.fulfilled:
+            return False
+        if not self.peers:
+            return True
+        rank = responder_order(req_id, self.peers).index(self.me)
+        if rank == 0:
+            return True
+        # Backups step in one grace period per rank if the elected peer stays silent
+        now = time.time() if now is None else now
+        self.deferred[req_id] = (now + rank * self.grace, db_query)
+        return False
+
+    def due(self, now=None):
+        """Deferred requests whose backup window has opened and are still unanswered"""
+        now = time.time() if now is None else now
+        ready = [req_id for req_id, (due_at, _) in self.deferred.items() if due_at <= now]
+        return [(req_id, self.deferred.pop(req_id)[1]) for req_id in ready]
@@ -0,0 +1,156 @@
+import time
+import threading
+import requests
+from web3 import HTTPProvider
+from web3.providers import JSONBaseProvider
+
+# Anything that must see the same mempool/nonce view as our own writes
+PINNED_METHODS = {
+    "eth_sendRawTransaction",
+    "eth_sendTransaction",
+    "eth_getTransactionCount",
+    "eth_estimateGas",
+    "eth_getTransactionByHash"
+}
+
+# Answers that depend on how far the node has synced go to the furthest-ahead
+# endpoint, so a block or receipt we were just told about is never "missing"
+HEAD_METHODS = {
+    "eth_blockNumber",
+    "eth_getBlockByNumber",
+    "eth_getBlockByHash",
+    "eth_getTransactionReceipt"
+}
+
+class Endpoint:
+    def __init__(self, url, timeout):
+        self.url = url
+        # One keep-alive session per endpoint
+        self.session = requests.Session()
+        self.provider = HTTPProvider(url, request_kwargs={'timeout': timeout}, session=self.session)
+        self.latency = 0.05
+        self.error_rate = 0.0
+        self.failures = 0
+        self.down_until = 0.0
+        self.block_number = 0
+        # Set by the health check while behind the head; only catching up clears it
+        self.lagging = False
+
+    def healthy(self, now):
+        return now >= self.down_until and not self.lagging
+
+    def score(self):
+        return self.latency * (1 + 10 * self.error_rate)
+
+class ProviderPool(JSONBaseProvider):
+    """Route RPC calls across several endpoints with health tracking and failover"""
+
+    def __init__(self, urls, timeout=10, max_lag=5, check_interval=10):
+        super().__init__()
+        self.endpoints = [Endpoint(url, timeout) for url in urls]
+        self.max_lag = max_lag
+        self.lock = threading.Lock()
+        self.write_endpoint = self.endpoints[0]
+        self.check_interval = check_interval
+        threading.Thread(target=self._health_loop, daemon=True).start()
+
+    def __str__(self):
+        return f"ProviderPool({', '.join(e.url for e in self.endpoints)})"
+
+    def make_request(self, method, params):
+        now = time.time()
+        with self.lock:
+            if method in PINNED_METHODS:
+                if not self.write_endpoint.healthy(now):
+                    self._repin(now)
+                candidates = [self.write_endpoint]
+            elif method in HEAD_METHODS:
+                candidates = sorted(
+                    (e for e in self.endpoints if e.healthy(now)),
+                    key=lambda e: (-e.block_number, e.score())
+                )
+            else:
+                candidates = sorted(
+                    (e for e in self.endpoints if e.healthy(now)),
+                    key=Endpoint.score
+                )
+            # Unhealthy endpoints are still a last resort before giving up
+            candidates += [e for e in self.endpoints if e not in candidates]
+
+        last_error = None
+        for endpoint in candidates:
+            started = time.time()
+            try:
+                response = endpoint.provider.make_request(method, params)
+            except Exception as e:
+                self._record(endpoint, time.time() - started, failed=True)
+                last_error = e
+                if method in PINNED_METHODS:
+                    with self.lock:
+                        self._repin(time.time())
+                continue
+            self._record(endpoint, time.time() - started, failed=False)
+            if method == "eth_blockNumber" and "result" in response:
+                with self.lock:
+                    endpoint.block_number = max(endpoint.block_number, int(response["result"], 16))
+            return response
+        raise last_error
+
+    def _record(self, endpoint, elapsed, failed):
+        with self.lock:
+            endpoint.latency = 0.8 * endpoint.latency + 0.2 * elapsed
+            endpoint.error_rate = 0.9 * endpoint.error_rate + (0.1 if failed else 0.0)
+            if failed:
+                endpoint.failures += 1
+                # Exponential backoff, capped at a minute
+                endpoint.down_until = time.time() + min(2 ** endpoint.failures, 60)
+            else:
+                endpoint.failures = 0
+                endpoint.down_until = 0.0
+
+    def _repin(self, now):
+        healthy = [e for e in self.endpoints if e.healthy(now)]
+        if healthy:
+            best = min(healthy, key=Endpoint.score)
+            if best is not self.write_endpoint:
+                print(f"🔀 Switching write endpoint to {best.url}")
+                self.write_endpoint = best
+
+    def is_connected(self, show_traceback=False):
+        return any(e.provider.is_connected() for e in self.endpoints)
+
+    def _health_loop(self):
+        while True:
+            for endpoint in self.endpoints:
+                started = time.time()
+                try:
+                    response = endpoint.provider.make_request("eth_blockNumber", [])
+                    endpoint.block_number = int(response["result"], 16)
+                    self._record(endpoint, time.time() - started, failed=False)
+                except Exception:
+                    self._record(endpoint, time.time() - started, failed=True)
+            # Endpoints lagging the best-known head serve stale reads; bench them until
+            # they catch up, however many unrelated calls they answer in the meantime
+            head = max(e.block_number for e in self.endpoints)
+            with self.lock:
+                for endpoint in self.endpoints:
+                    lagging = head - endpoint.block_number > self.max_lag
+                    if lagging != endpoint.lagging:
+                        print(f"{'🐢' if lagging else '✅'} {endpoint.url} is at block {endpoint.block_number}, head {head}")
+                    endpoint.lagging = lagging
+            time.sleep(self.check_interval)
+
+    def status(self):
+        now = time.time()
+        with self.lock:
+            return [
+                {
+                    "url": e.url,
+                    "healthy": e.healthy(now),
+                    "latency_ms": round(e.latency * 1000, 1),
+                    "error_rate": round(e.error_rate, 3),
+                    "block": e.block_number,
+                    "writes": e is self.write_endpoint
+                }
+                for e in self.endpoints
+            ]
@@ -0,0 +1,97 @@
+import re
+import json
+import time
+import heapq
+from compression import decompress_response
+
+NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+def gather(contract, req_ids, from_block, deadline=60, poll_interval=2):
+    """Collect ResponseSent events for req_ids until all arrive or the deadline passes"""
+    pending = set(req_ids)
+    results = {}
+    stop_at = time.time() + deadline
+    while pending:
+        events = contract.events.ResponseSent().get_logs(
+            from_block=from_block,
+            argument_filters={'requestId': sorted(pending)}
+        )
+        for event in events:
+            if event.args.requestId in pending:
+                pending.discard(event.args.requestId)
+                results[event.args.requestId] = (event.args.responder, event.args.response)
+        if not pending or time.time() >= stop_at:
+            break
+        time.sleep(poll_interval)
+    return results
+
+def _numeric(cell):
+    if isinstance(cell, (int, float)):
+        return float(cell)
+    match = NUMBER.search(str(cell))
+    return float(match.group()) if match else None
+
+def _sort_key(column):
+    # Peers' columns can mix types (null, numbers, text); rank types first so
+    # any two cells compare instead of raising TypeError
+    def key(row):
+        cell = row[column]
+        if cell is None:
+            return (0, 0)
+        if isinstance(cell, (int, float)):
+            return (1, cell)
+        return (2, str(cell))
+    return key
+
+def merge_results(responses, mode="union", column=0):
+    """Merge JSON row lists from several peers: union, sorted, sum or avg"""
+    row_sets = []
+    errors = []
+    for response in responses:
+        try:
+            rows = json.loads(decompress_response(response))
+        except ValueError:
+            errors.append(response)
+            continue
+        # Delta envelopes carry their rows; any other object (e.g. a busy reply) is not a result
+        if isinstance(rows, dict):
+            rows = rows.get("rows")
+        if not isinstance(rows, list) or not all(isinstance(row, list) for row in rows):
+            errors.append(response)
+            continue
+        if mode != "union" and any(len(row) <= column for row in rows):
+            errors.append(f"No column {column} in: {response[:200]}")
+            continue
+        row_sets.append([tuple(row) for row in rows])
+
+    if mode == "union":
+        merged = list(dict.fromkeys(row for rows in row_sets for row in rows))
+    elif mode == "sorted":
+        # Each peer's rows are sorted locally, then k-way merged
+        key = _sort_key(column)
+        merged = list(heapq.merge(*[sorted(rows, key=key) for rows in row_sets], key=key))
+    elif mode in ("sum", "avg"):
+        values = [v for rows in row_sets for row in rows if (v := _numeric(row[column])) is not None]
+        total = sum(values)
+        merged = total if mode == "sum" else (total / len(values) if values else None)
+    else:
+        raise ValueError(f"unknown merge mode: {mode}")
+    return merged, errors
+
+def scatter_gather(contract, send_transaction, wait_for_receipt, targets, query, mode="union", column=0, deadline=60):
+    """Send one query to many peers in a single transaction and merge their answers"""
+    tx_hash = send_transaction(contract.functions.createRequests(targets, query))
+    receipt = wait_for_receipt(tx_hash, timeout=120)
+    if receipt.status != 1:
+        raise RuntimeError("createRequests transaction failed")
+    created = contract.events.RequestCreated().process_receipt(receipt)
+    target_by_id = {event.args.requestId: event.args.target for event in created}
+
+    results = gather(contract, list(target_by_id), receipt.blockNumber, deadline)
+    merged, errors = merge_results([response for _, response in results.values()], mode, column)
+    return {
+        "result": merged,
+        "responded": [target_by_id[req_id] for req_id in results],
+        "missing": [target for req_id, target in target_by_id.items() if req_id not in results],
+        "errors": errors
+    }
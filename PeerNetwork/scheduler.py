@@ -0,0 +1,157 @@
+import re
+import time
+import heapq
+import itertools
+import threading
+from query_protocol import decode_request
+
+EXPENSIVE_SQL = re.compile(r"\b(JOIN|GROUP\s+BY|ORDER\s+BY|DISTINCT|UNION)\b", re.IGNORECASE)
+
+def estimate_cost(db_query):
+    """Rough relative cost of answering a request; structured ops are cheapest"""
+    request = decode_request(db_query)
+    if request:
+        return 1 + len(request.get("keys") or []) / 100
+    cost = 2
+    if not re.search(r"\bWHERE\b", db_query, re.IGNORECASE):
+        cost += 4
+    cost += 3 * len(EXPENSIVE_SQL.findall(db_query))
+    return cost
+
+def priority_class(cost):
+    return 0 if cost <= 2 else 1 if cost <= 6 else 2
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.time()
+
+    def take(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+class RequestScheduler:
+    """Weighted fair queueing of incoming requests per requester, with rate limits.
+
+    Cheaper priority classes get a head start of class_lead virtual-time units
+    per class rather than strict precedence, so a flood of cheap requests from
+    one requester delays everyone else's expensive ones by a bounded amount
+    instead of starving them.
+    """
+
+    def __init__(self, rate=1.0, burst=10, max_queued=100, weights=None, class_lead=10.0):
+        self.rate = rate
+        self.burst = burst
+        self.max_queued = max_queued
+        self.weights = weights or {}
+        self.class_lead = class_lead
+        self.heap = []
+        self.virtual_time = 0.0
+        self.last_finish = {}
+        self.buckets = {}
+        self.queued = {}
+        self.stats = {"queued": 0, "dispatched": 0, "deferred": 0, "dropped": 0}
+        self.per_requester = {}
+        self.deferred_seqs = set()
+        self._seq = itertools.count()
+        self.cond = threading.Condition()
+
+    def _count(self, requester, key):
+        self.stats[key] += 1
+        counts = self.per_requester.setdefault(requester, {"dispatched": 0, "deferred": 0, "dropped": 0})
+        if key in counts:
+            counts[key] += 1
+
+    def submit(self, requester, item, cost):
+        """Queue work for a requester; False if their queue is full and it was dropped"""
+        requester = requester.lower()
+        with self.cond:
+            if self.queued.get(requester, 0) >= self.max_queued:
+                self._count(requester, "dropped")
+                return False
+            # Finish tag: a requester's items are spaced by cost / weight in virtual time
+            start = max(self.virtual_time, self.last_finish.get(requester, 0.0))
+            finish = start + cost / self.weights.get(requester, 1.0)
+            self.last_finish[requester] = finish
+            tag = finish + priority_class(cost) * self.class_lead
+            heapq.heappush(self.heap, (tag, finish, next(self._seq), requester, item))
+            self.queued[requester] = self.queued.get(requester, 0) + 1
+            self.stats["queued"] += 1
+            self.cond.notify()
+            return True
+
+    def allow(self, requester):
+        """Take one of requester's tokens for work answered outside the queue"""
+        requester = requester.lower()
+        with self.cond:
+            bucket = self.buckets.setdefault(requester, TokenBucket(self.rate, self.burst))
+            if bucket.take(time.time()):
+                return True
+            self._count(requester, "dropped")
+            return False
+
+    def get(self, timeout=None):
+        """Next eligible item, or None if nothing is eligible before the timeout"""
+        deadline = time.time() + timeout if timeout is not None else None
+        with self.cond:
+            while True:
+                item = self._pop_eligible()
+                if item is not None:
+                    return item
+                remaining = deadline - time.time() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return None
+                # Rate-limited items become eligible as tokens refill
+                self.cond.wait(min(remaining, 0.5) if remaining is not None else 0.5)
+
+    def _pop_eligible(self):
+        now = time.time()
+        skipped = []
+        found = None
+        limited = set()
+        while self.heap:
+            entry = heapq.heappop(self.heap)
+            requester = entry[3]
+            if requester in limited:
+                skipped.append(entry)
+                continue
+            bucket = self.buckets.setdefault(requester, TokenBucket(self.rate, self.burst))
+            if bucket.take(now):
+                found = entry
+                break
+            limited.add(requester)
+            skipped.append(entry)
+            if entry[2] not in self.deferred_seqs:
+                self.deferred_seqs.add(entry[2])
+                self._count(requester, "deferred")
+        for entry in skipped:
+            heapq.heappush(self.heap, entry)
+        if found is None:
+            return None
+        _, finish, seq, requester, item = found
+        self.deferred_seqs.discard(seq)
+        self.virtual_time = max(self.virtual_time, finish)
+        self.queued[requester] -= 1
+        self._count(requester, "dispatched")
+        return item
+
+    def __len__(self):
+        with self.cond:
+            return len(self.heap)
+
+    def snapshot(self):
+        """Copy of global and per-requester counters for reporting"""
+        with self.cond:
+            return {
+                "totals": dict(self.stats, waiting=len(self.heap)),
+                "requesters": {
+                    requester: dict(counts, waiting=self.queued.get(requester, 0))
+                    for requester, counts in self.per_requester.items()
+                }
+            }
@@ -0,0 +1,150 @@
+import sys
+import csv
+import sqlite3
+import pathlib
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS data (
+    key TEXT PRIMARY KEY,               -- Unique identifier for the sensor data
+    value TEXT NOT NULL,                -- The actual sensor reading (e.g., temperature, humidity)
+    model_number TEXT NOT NULL,         -- Model number of the sensor
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP -- Timestamp when the data was recorded
+);
+-- Covers "latest readings for a model since T" without touching the table
+CREATE INDEX IF NOT EXISTS idx_data_model_ts ON data (model_number, timestamp, key, value);
+-- Time-range scans across all models
+CREATE INDEX IF NOT EXISTS idx_data_ts ON data (timestamp);
+"""
+
+INGEST_SQL = (
+    "INSERT OR REPLACE INTO data (key, value, model_number, timestamp) "
+    "VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))"
+)
+
+# Statements remote SQL may run: plain reads. Anything that writes, attaches
+# or sets a PRAGMA would otherwise stick to the thread's reused connection.
+READ_ONLY_ACTIONS = {
+    sqlite3.SQLITE_SELECT,
+    sqlite3.SQLITE_READ,
+    sqlite3.SQLITE_FUNCTION,
+    getattr(sqlite3, "SQLITE_RECURSIVE", 33)
+}
+
+# Largest `latest` answer; LIMIT -1 (or a huge limit) would otherwise dump the table
+MAX_ROWS = 500
+
+def _read_only(action, arg1, arg2, db_name, trigger):
+    return sqlite3.SQLITE_OK if action in READ_ONLY_ACTIONS else sqlite3.SQLITE_DENY
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def open_store(db_path):
+    """Return the shared SensorStore for a database path"""
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store is None:
+            store = _stores[db_path] = SensorStore(db_path)
+        return store
+
+class SensorStore:
+    """Managed access to a peer's sensor database"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._schema_ready = False
+
+    def connection(self):
+        """One reusable connection per thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # So INSERT OR REPLACE fires delete triggers for the rows it replaces (see delta_query)
+            conn.execute("PRAGMA recursive_triggers=ON")
+            self._local.conn = conn
+        if not self._schema_ready:
+            conn.executescript(SCHEMA)
+            self._schema_ready = True
+        return conn
+
+    def reader(self):
+        """One read-only connection per thread, kept apart from the one we write with"""
+        conn = getattr(self._local, "reader", None)
+        if conn is None:
+            # The schema must exist before a read-only connection can see it
+            self.connection()
+            conn = sqlite3.connect(pathlib.Path(self.db_path).resolve().as_uri() + "?mode=ro", uri=True)
+            conn.set_authorizer(_read_only)
+            self._local.reader = conn
+        return conn
+
+    def execute(self, query, params=()):
+        conn = self.reader()
+        try:
+            return conn.execute(query, params).fetchall()
+        finally:
+            # Remote queries are read-only, as with the old connect-per-query path
+            if conn.in_transaction:
+                conn.rollback()
+
+    def ingest(self, rows, batch_size=10000):
+        """Bulk insert (key, value, model_number[, timestamp]) rows"""
+        conn = self.connection()
+        count = 0
+        batch = []
+        for row in rows:
+            row = tuple(row)
+            batch.append(row if len(row) == 4 else row + (None,))
+            if len(batch) >= batch_size:
+                count += self._write(conn, batch)
+                batch = []
+        if batch:
+            count += self._write(conn, batch)
+        return count
+
+    def _write(self, conn, batch):
+        with conn:
+            conn.executemany(INGEST_SQL, batch)
+        return len(batch)
+
+    def latest(self, limit=10, since=None, model_number=None):
+        """Newest readings first, optionally for one model and after a timestamp"""
+        clauses = []
+        params = []
+        if model_number is not None:
+            clauses.append("model_number = ?")
+            params.append(model_number)
+        if since is not None:
+            clauses.append("timestamp > ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        params.append(max(1, min(int(limit), MAX_ROWS)))
+        return self.execute(
+            "SELECT key, value, model_number, timestamp FROM data "
+            f"{where}ORDER BY timestamp DESC LIMIT ?",
+            params
+        )
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[2] not in ("ingest", "latest", "index"):
+        print("Usage: python sensor_store.py <db> ingest <file.csv>")
+        print("       python sensor_store.py <db> latest [limit] [since] [model_number]")
+        print("       python sensor_store.py <db> index")
+        sys.exit(1)
+
+    store = open_store(sys.argv[1])
+    if sys.argv[2] == "ingest":
+        with open(sys.argv[3], newline="") as f:
+            count = store.ingest(csv.reader(f))
+        print(f"✅ Ingested {count} rows into {sys.argv[1]}")
+    elif sys.argv[2] == "latest":
+        args = sys.argv[3:] + [None] * 3
+        for row in store.latest(args[0] or 10, args[1], args[2]):
+            print("   ", row)
+    else:
+        store.connection()
+        print(f"✅ Schema and indexes ready in {sys.argv[1]}")
@@ -0,0 +1,94 @@
+from web3 import Web3
+from direct_transport import sign_digest, recover_signer
+
+# Responder-signed answers to on-chain requests. A signature over (contract,
+# request ID, result hash) proves who answered just as well as the sender of a
+# ResponseSent event, so the response itself can travel over any channel and
+# be committed on chain later, many at a time, as a Merkle root.
+BULK_THRESHOLD = 64
+
+def result_hash(response):
+    return bytes(Web3.keccak(text=response))
+
+def response_digest(contract_address, req_id, response_hash):
+    return Web3.solidity_keccak(
+        ["address", "uint256", "bytes32"],
+        [Web3.to_checksum_address(contract_address), req_id, response_hash]
+    )
+
+def sign_response(private_key, contract_address, req_id, response):
+    signature = sign_digest(private_key, response_digest(contract_address, req_id, result_hash(response)))
+    return "0x" + bytes(signature).hex()
+
+def _recover(item):
+    contract_address, req_id, response, signature = item
+    digest = response_digest(contract_address, req_id, result_hash(response))
+    return recover_signer(digest, bytes.fromhex(signature[2:]))
+
+def verify_responses(contract_address, items, executor=None):
+    """Signer of each (req_id, response, signature), in order; None where unreadable.
+
+    Recovery is CPU-bound, so large batches go to executor (e.g. the signing
+    pipeline's already-forked process pool) when one is given.
+    """
+    work = [(contract_address, req_id, response, signature) for req_id, response, signature in items]
+    if executor is None or len(work) < BULK_THRESHOLD:
+        return [_safe_recover(item) for item in work]
+    return list(executor.map(_safe_recover, work, chunksize=32))
+
+def _safe_recover(item):
+    try:
+        return _recover(item)
+    except Exception:
+        return None
+
+# --- Merkle utilities ---
+# Leaves are double-hashed so no leaf can pass for an inner node, and pairs
+# are hashed in sorted order so proofs need no left/right flags. DataTransfer
+# builds the same tree from the committed (request ID, response hash) pairs,
+# so merkle_root here must agree with the root commitResponseBatch emits.
+
+def merkle_leaf(req_id, response_hash):
+    inner = Web3.solidity_keccak(["uint256", "bytes32"], [req_id, response_hash])
+    return bytes(Web3.keccak(bytes(inner)))
+
+def _hash_pair(a, b):
+    return bytes(Web3.keccak(a + b if a <= b else b + a))
+
+def merkle_levels(leaves):
+    """Every level of the tree, leaves first; an odd node is carried up unchanged"""
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        levels.append([
+            _hash_pair(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+            for i in range(0, len(level), 2)
+        ])
+    return levels
+
+def merkle_root(leaves):
+    if not leaves:
+        raise ValueError("Cannot build a Merkle tree without leaves")
+    return merkle_levels(leaves)[-1][0]
+
+def batch_tree(items):
+    """Levels for (req_id, response) items plus the response hashes commitResponseBatch takes"""
+    hashes = [result_hash(response) for _, response in items]
+    levels = merkle_levels([merkle_leaf(req_id, h) for (req_id, _), h in zip(items, hashes)])
+    return levels, hashes
+
+def merkle_proof(levels, index):
+    """Sibling hashes from leaf `index` up to the root"""
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append(level[sibling])
+        index //= 2
+    return proof
+
+def verify_proof(leaf, proof, root):
+    node = leaf
+    for sibling in proof:
+        node = _hash_pair(node, sibling)
+    return node == root
@@ -0,0 +1,115 @@
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from eth_abi import encode
+from eth_account import Account
+from eth_utils import function_signature_to_4byte_selector, to_checksum_address
+
+_worker_keys = {}
+
+def _init_worker(private_keys):
+    for private_key in private_keys:
+        _worker_keys[Account.from_key(private_key).address] = private_key
+
+def _ready(_):
+    return True
+
+def _sign(tx, address):
+    return bytes(Account.sign_transaction(tx, _worker_keys[address]).raw_transaction)
+
+def calldata_gas(data):
+    zeros = data.count(0)
+    return zeros * 4 + (len(data) - zeros) * 16
+
+class CallTemplate:
+    """Static fields of one contract function call, computed once"""
+
+    def __init__(self, to, signature, arg_types, chain_id, gas_price, base_gas=30000):
+        self.to = to_checksum_address(to)
+        self.selector = function_signature_to_4byte_selector(signature)
+        self.arg_types = arg_types
+        self.chain_id = chain_id
+        self.gas_price = gas_price
+        self.base_gas = base_gas
+
+    def calldata(self, *args):
+        return self.selector + encode(self.arg_types, args)
+
+    def gas_limit(self, data):
+        # Upper bound without an eth_estimateGas round-trip: intrinsic + calldata,
+        # a fresh storage slot and log bytes for every calldata word, plus a margin
+        words = (len(data) + 31) // 32
+        return 21000 + calldata_gas(data) + words * (22100 + 256) + self.base_gas
+
+    def build(self, nonce, *args):
+        data = self.calldata(*args)
+        return {
+            'to': self.to,
+            'data': data,
+            'value': 0,
+            'gas': self.gas_limit(data),
+            'gasPrice': self.gas_price,
+            'nonce': nonce,
+            'chainId': self.chain_id
+        }
+
+class SigningPipeline:
+    """Sign transactions in a worker pool and broadcast them in nonce order"""
+
+    def __init__(self, private_keys, workers=2, processes=True):
+        if processes and "fork" in multiprocessing.get_all_start_methods():
+            # Fork (not spawn) so workers never re-run the interactive peer script,
+            # and start them all now, before the node starts its own threads.
+            # Submitting one task per worker before waiting on any makes the
+            # pool fork every worker up front.
+            self.executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_init_worker,
+                initargs=(list(private_keys),)
+            )
+            list(self.executor.map(_ready, range(workers)))
+        else:
+            self.executor = ThreadPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(list(private_keys),)
+            )
+        self.outbox = queue.Queue()
+        threading.Thread(target=self._send_loop, daemon=True).start()
+
+    def submit(self, tx_manager, template, *args, ttl=None, preflight=True):
+        """Queue a call from tx_manager's account; returns a Future resolving to the tx hash
+
+        Gas limits come from the template rather than eth_estimateGas, so with
+        preflight the call is first run as an eth_call: one that would revert
+        raises here, before it takes a nonce or costs any gas.
+        """
+        if preflight:
+            tx_manager.w3.eth.call({
+                'from': tx_manager.acct.address,
+                'to': template.to,
+                'data': template.calldata(*args)
+            })
+        result = Future()
+        # Holding the manager lock keeps outbox order identical to nonce order
+        with tx_manager.lock:
+            nonce = tx_manager.allocate_nonce()
+            tx = template.build(nonce, *args)
+            self.outbox.put((tx_manager, nonce, tx, self.executor.submit(_sign, tx, tx_manager.acct.address), ttl, result))
+        return result
+
+    def _send_loop(self):
+        while True:
+            tx_manager, nonce, tx, signed, ttl, result = self.outbox.get()
+            try:
+                raw_transaction = signed.result()
+            except Exception as e:
+                tx_manager.release_nonce(nonce)
+                result.set_exception(e)
+                continue
+            try:
+                result.set_result(tx_manager.send_signed(nonce, tx, raw_transaction, ttl))
+            except Exception as e:
+                result.set_exception(e)
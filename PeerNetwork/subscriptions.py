@@ -0,0 +1,98 @@
+import json
+import time
+import hashlib
+from query_protocol import decode_request
+from delta_query import delta_scope
+
+class SubscriptionManager:
+    """Run standing queries on their interval and collect new results for delivery"""
+
+    def __init__(self, store, deltas):
+        self.store = store
+        self.deltas = deltas
+        self.subs = {}
+
+    def add(self, sub_id, requester, db_query, interval, block_number=None):
+        self.subs[sub_id] = {
+            "block": block_number,
+            "requester": requester,
+            "request": decode_request(db_query),
+            "query": db_query,
+            "interval": interval,
+            "next_due": time.time(),
+            "digest": None,
+            # What to record once the delivery in flight is confirmed on chain
+            "in_flight": None
+        }
+
+    def cancel(self, sub_id):
+        return self.subs.pop(sub_id, None) is not None
+
+    def rollback(self, block_number):
+        """Drop subscriptions whose creation was reorged away"""
+        for sub_id in [sub_id for sub_id, sub in self.subs.items() if (sub["block"] or 0) > block_number]:
+            del self.subs[sub_id]
+
+    def confirm(self, sub_ids):
+        """The delivery carrying these subscriptions was mined: move their watermarks on"""
+        for sub_id in sub_ids:
+            sub = self.subs.get(sub_id)
+            if sub is None or sub["in_flight"] is None:
+                continue
+            kind, value = sub["in_flight"]
+            if kind == "delta":
+                self.deltas.set_watermark(f"sub:{sub_id}", delta_scope(sub["request"]), value)
+            else:
+                sub["digest"] = value
+            sub["in_flight"] = None
+
+    def release(self, sub_ids):
+        """The delivery failed: run these subscriptions again from the same point"""
+        for sub_id in sub_ids:
+            sub = self.subs.get(sub_id)
+            if sub is not None:
+                sub["in_flight"] = None
+                sub["next_due"] = time.time()
+
+    def __len__(self):
+        return len(self.subs)
+
+    def collect_due(self, now=None):
+        """Return [(sub_id, response)] for due subscriptions that have something new
+
+        Nothing advances until confirm(); a subscription with a delivery still
+        in flight is skipped so the same update is never sent twice.
+        """
+        now = time.time() if now is None else now
+        batch = []
+        for sub_id, sub in self.subs.items():
+            if sub["next_due"] > now or sub["in_flight"] is not None:
+                continue
+            sub["next_due"] = now + sub["interval"]
+            response = self._run(sub_id, sub)
+            if response is not None:
+                batch.append((sub_id, response))
+        return batch
+
+    def _run(self, sub_id, sub):
+        request = sub["request"]
+        if request and request["op"] == "delta":
+            # Watermarks are tracked per subscription, not per requester
+            response = self.deltas.answer(f"sub:{sub_id}", request, advance=False)
+            if response.startswith("{"):
+                envelope = json.loads(response)
+                if not envelope["rows"]:
+                    return None
+                sub["in_flight"] = ("delta", envelope["watermark"])
+            return response
+
+        # Plain SQL has no watermark, so deliver only when the result changes
+        try:
+            response = json.dumps(self.store.execute(sub["query"]))
+        except Exception as e:
+            response = f"Error: {str(e)}"
+        digest = hashlib.sha256(response.encode()).digest()
+        if digest == sub["digest"]:
+            return None
+        sub["in_flight"] = ("digest", digest)
+        return response
@@ -0,0 +1,252 @@
+import time
+import threading
+from web3.exceptions import TransactionNotFound
+
+class TxManager:
+    """Local nonce sequencing plus recovery of stalled transactions"""
+
+    def __init__(self, w3, acct, gas_price, stall_after=30, bump=1.125, max_gas_price=None):
+        self.w3 = w3
+        self.acct = acct
+        self.gas_price = gas_price
+        self.stall_after = stall_after
+        self.bump = bump
+        self.max_gas_price = max_gas_price or gas_price * 20
+        self.lock = threading.RLock()
+        self.next_nonce = None
+        self.mined_nonce = 0
+        self.pending = {}
+        self.nonce_by_hash = {}
+        self.cancel_hashes = set()
+
+    # --- Sending ---
+
+    def send(self, fn, ttl=None):
+        """Estimate, sign and broadcast a contract call; returns the tx hash"""
+        gas_estimate = fn.estimate_gas({'from': self.acct.address})
+        with self.lock:
+            nonce = self.allocate_nonce()
+            tx = fn.build_transaction({
+                'from': self.acct.address,
+                'nonce': nonce,
+                'gas': gas_estimate + 50000,
+                'gasPrice': self.gas_price
+            })
+            return self._broadcast(nonce, tx, ttl)
+
+    def send_raw(self, tx, ttl=None):
+        """Broadcast a prepared transaction dict, assigning it the next local nonce"""
+        with self.lock:
+            tx = dict(tx, nonce=self.allocate_nonce())
+            tx.setdefault('gasPrice', self.gas_price)
+            return self._broadcast(tx['nonce'], tx, ttl)
+
+    def send_value(self, to, value):
+        """Plain ETH transfer from this account"""
+        with self.lock:
+            nonce = self.allocate_nonce()
+            tx = {
+                'from': self.acct.address,
+                'to': to,
+                'value': value,
+                'nonce': nonce,
+                'gas': 21000,
+                'gasPrice': self.gas_price,
+                'chainId': self.w3.eth.chain_id
+            }
+            return self._broadcast(nonce, tx, None)
+
+    def allocate_nonce(self):
+        """Reserve the next nonce in the local sequence"""
+        with self.lock:
+            if self.next_nonce is None:
+                self.next_nonce = self.w3.eth.get_transaction_count(self.acct.address, 'pending')
+            nonce = self.next_nonce
+            self.next_nonce += 1
+            return nonce
+
+    def send_signed(self, nonce, tx, raw_transaction, ttl=None):
+        """Broadcast a transaction signed elsewhere at a nonce from allocate_nonce"""
+        with self.lock:
+            try:
+                tx_hash = self.w3.eth.send_raw_transaction(raw_transaction)
+            except Exception as e:
+                if "nonce too low" not in str(e).lower():
+                    self.release_nonce(nonce)
+                    raise
+                # The pre-signed copy is stale; sign it again at a resynced nonce
+                tx = dict(tx)
+                nonce, tx_hash = self._resend_fresh(tx)
+            self._track(nonce, tx, tx_hash, ttl)
+            return tx_hash
+
+    def _broadcast(self, nonce, tx, ttl):
+        try:
+            tx_hash = self._sign_and_send(tx)
+        except Exception as e:
+            if "nonce too low" in str(e).lower():
+                nonce, tx_hash = self._resend_fresh(tx)
+            else:
+                self.release_nonce(nonce)
+                raise
+        self._track(nonce, tx, tx_hash, ttl)
+        return tx_hash
+
+    def _resend_fresh(self, tx):
+        # Someone else used this account; resync once and retry at a fresh nonce
+        self.next_nonce = None
+        tx['nonce'] = self.allocate_nonce()
+        return tx['nonce'], self._sign_and_send(tx)
+
+    def _track(self, nonce, tx, tx_hash, ttl):
+        self.pending[nonce] = {
+            'tx': tx,
+            'hashes': [tx_hash],
+            'sent_at': time.time(),
+            'expires_at': time.time() + ttl if ttl else None
+        }
+        self.nonce_by_hash[tx_hash] = nonce
+
+    def _sign_and_send(self, tx):
+        signed = self.acct.sign_transaction(tx)
+        return self.w3.eth.send_raw_transaction(signed.raw_transaction)
+
+    def release_nonce(self, nonce):
+        """Give back a nonce whose transaction never reached the network"""
+        if nonce == self.next_nonce - 1:
+            self.next_nonce = nonce
+        else:
+            # Later nonces are already out; fill the hole so they are not stuck behind it
+            try:
+                self._send_cancel(nonce, self.gas_price)
+            except Exception as e:
+                print(f"⚠️ Could not fill nonce gap {nonce}: {str(e)}")
+
+    # --- Recovery ---
+
+    def cancel(self, nonce):
+        """Replace a pending transaction with a zero-value self-transfer"""
+        with self.lock:
+            entry = self.pending.get(nonce)
+            if entry:
+                self._send_cancel(nonce, self._bumped(entry['tx']['gasPrice']))
+
+    def _send_cancel(self, nonce, gas_price):
+        tx = {
+            'from': self.acct.address,
+            'to': self.acct.address,
+            'value': 0,
+            'nonce': nonce,
+            'gas': 21000,
+            'gasPrice': gas_price,
+            'chainId': self.w3.eth.chain_id
+        }
+        tx_hash = self._sign_and_send(tx)
+        entry = self.pending.setdefault(nonce, {'hashes': [], 'expires_at': None})
+        entry.update(tx=tx, sent_at=time.time(), expires_at=None)
+        entry['hashes'].append(tx_hash)
+        self.nonce_by_hash[tx_hash] = nonce
+        self.cancel_hashes.add(tx_hash)
+        print(f"🚫 Cancelling nonce {nonce}, tx: {tx_hash.hex()}")
+
+    def _bumped(self, gas_price):
+        network_price = self.w3.eth.gas_price
+        return min(max(int(gas_price * self.bump) + 1, network_price), self.max_gas_price)
+
+    def _receipt(self, nonce):
+        return self._first_receipt(self.pending[nonce]['hashes'])
+
+    def _first_receipt(self, hashes):
+        for tx_hash in hashes:
+            try:
+                return self.w3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                continue
+        return None
+
+    def check(self):
+        """Drop mined transactions and rescue stalled or expired ones"""
+        with self.lock:
+            if not self.pending:
+                return
+            mined_nonce = self.w3.eth.get_transaction_count(self.acct.address, 'latest')
+            self.mined_nonce = mined_nonce
+            now = time.time()
+            for nonce in sorted(self.pending):
+                entry = self.pending[nonce]
+                # The nonce test is free; a receipt lookup is an RPC made under the lock
+                if nonce < mined_nonce or self._receipt(nonce) is not None:
+                    continue
+                if entry['expires_at'] and now > entry['expires_at']:
+                    self._send_cancel(nonce, self._bumped(entry['tx']['gasPrice']))
+                elif now - entry['sent_at'] > self.stall_after:
+                    self._replace(nonce, entry)
+            self._prune(mined_nonce)
+
+    def _replace(self, nonce, entry):
+        try:
+            self.w3.eth.get_transaction(entry['hashes'][-1])
+            known = True
+        except TransactionNotFound:
+            known = False
+
+        tx = dict(entry['tx'])
+        if known:
+            # Still in the mempool but not moving: outbid ourselves at the same nonce
+            tx['gasPrice'] = self._bumped(tx['gasPrice'])
+            if tx['gasPrice'] <= entry['tx']['gasPrice']:
+                return
+            print(f"⛽ Replacing stalled nonce {nonce} at {self.w3.from_wei(tx['gasPrice'], 'gwei')} gwei")
+        else:
+            print(f"🔁 Re-broadcasting dropped nonce {nonce}")
+        tx_hash = self._sign_and_send(tx)
+        entry.update(tx=tx, sent_at=time.time())
+        if tx_hash not in entry['hashes']:
+            entry['hashes'].append(tx_hash)
+            self.nonce_by_hash[tx_hash] = nonce
+
+    def _prune(self, mined_nonce):
+        # Keep mined entries briefly so waiters can still pick up their receipts
+        cutoff = time.time() - 300
+        for nonce in [n for n, e in self.pending.items() if n < mined_nonce and e['sent_at'] < cutoff]:
+            for tx_hash in self.pending.pop(nonce)['hashes']:
+                self.nonce_by_hash.pop(tx_hash, None)
+                self.cancel_hashes.discard(tx_hash)
+
+    def in_flight(self):
+        """Transactions broadcast but not yet mined, as of the last check"""
+        with self.lock:
+            return sum(1 for nonce in self.pending if nonce >= self.mined_nonce)
+
+    def wait_for_receipt(self, tx_hash, timeout=120, poll_interval=1):
+        """Like wait_for_transaction_receipt, but follows replacements of the same nonce.
+
+        Raises if the nonce was mined as a cancel: the original call never ran,
+        and the cancel's own receipt would otherwise read as a success.
+        Replacements are made by the run() monitor; this only polls, and
+        outside the lock, so waiters never hold up nonce allocation.
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with self.lock:
+                nonce = self.nonce_by_hash.get(tx_hash)
+                hashes = list(self.pending[nonce]['hashes']) if nonce in self.pending else []
+            if nonce is None:
+                return self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=max(deadline - time.time(), 1))
+            receipt = self._first_receipt(hashes)
+            if receipt is not None:
+                if receipt['transactionHash'] in self.cancel_hashes:
+                    raise RuntimeError(f"Transaction {tx_hash.hex()} was cancelled at nonce {nonce}")
+                return receipt
+            time.sleep(poll_interval)
+        raise TimeoutError(f"Transaction {tx_hash.hex()} not mined after {timeout}s")
+
+    def run(self, interval=5, others=()):
+        while True:
+            try:
+                self.check()
+                for manager in others:
+                    manager.check()
+            except Exception as e:
+                print(f"⚠️ Transaction monitor error: {str(e)}")
+            time.sleep(interval)